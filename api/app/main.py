@@ -1,22 +1,41 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import copy
+import hashlib
 import os
 import pathlib
-import shutil
-import tempfile
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import Body, FastAPI, File, Form, HTTPException, UploadFile
+import orjson
+from fastapi import FastAPI, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import PlainTextResponse, Response
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from app.optimizer import build_schedule, recheck_assignments, to_csv
+from app.optimizer import build_schedule, iter_csv, recheck_assignments
 from app.pdf import assignments_to_pdf
 from app.shiftmd_parser import parse_shift_md
 from app.validation import load_and_validate
 
-app = FastAPI(title="Nurse Shift Optimizer", version="0.2.0")
+# Handlers return ORJSONResponse directly for solver results so the large
+# assignment grids skip FastAPI's jsonable_encoder pass.
+app = FastAPI(title="Nurse Shift Optimizer", version="0.2.0", default_response_class=ORJSONResponse)
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+SCHEMA_DIR = REPO_ROOT / "packages/schemas"
+DEFAULT_MD_PATH = REPO_ROOT / "shift.md"
+_SHIFT_MD_ENV = os.environ.get("SHIFT_MD_PATH")
+
+MAX_ALTERNATIVES = 16
+# Errors caused by malformed input; anything else is a server bug and surfaces as a 500.
+# ValueError also covers UnicodeDecodeError, json/orjson decode errors and validation failures.
+_BAD_REQUEST = (ValueError, KeyError)
 
 origins_str = os.environ.get("ALLOWED_ORIGINS", "*")
 if origins_str == "*":
@@ -25,102 +44,259 @@ else:
     # カンマ区切りで複数のオリジンを許可
     allowed_origins = [o.strip() for o in origins_str.split(",") if o.strip()]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=allowed_origins,
-    allow_credentials=True if allowed_origins != ["*"] else False,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+
+# Bare ASGI equivalent of CORSMiddleware(allow_origins=["*"]) without credentials,
+# minus the per-request origin matching.
+class WildcardCORSMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if "origin" not in headers:
+            await self.app(scope, receive, send)
+            return
+        if scope["method"] == "OPTIONS" and "access-control-request-method" in headers:
+            preflight_headers = {
+                "Access-Control-Allow-Origin": "*",
+                "Access-Control-Allow-Methods": "DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT",
+                "Access-Control-Max-Age": "600",
+            }
+            requested_headers = headers.get("access-control-request-headers")
+            if requested_headers:
+                preflight_headers["Access-Control-Allow-Headers"] = requested_headers
+            response = PlainTextResponse("OK", status_code=200, headers=preflight_headers)
+            await response(scope, receive, send)
+            return
+
+        async def send_with_origin(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Overwrite like CORSMiddleware does, even if the endpoint set its own value
+                MutableHeaders(scope=message)["Access-Control-Allow-Origin"] = "*"
+            await send(message)
+
+        await self.app(scope, receive, send_with_origin)
+
+
+if allowed_origins == ["*"]:
+    app.add_middleware(WildcardCORSMiddleware)
+else:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=allowed_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+
+# Document the export bodies in OpenAPI; the handlers still parse them with orjson.
+class ExportCsvRequest(BaseModel):
+    assignments: List[Dict[str, Any]]
+
+
+class ExportPdfRequest(BaseModel):
+    assignments: List[Dict[str, Any]]
+    nurses: Optional[List[Dict[str, Any]]] = None
+    days: Optional[List[str]] = None
+    summary: Optional[Dict[str, Any]] = None
+    warnings: Optional[List[str]] = None
+
+
+class RecommendRequest(BaseModel):
+    assignments: List[Dict[str, Any]]
+    year: int = Field(2025, ge=2000, le=2100)
+    month: int = Field(10, ge=1, le=12)
+
+
+class ReoptimizeRequest(BaseModel):
+    assignments: Optional[List[Dict[str, Any]]] = None
+    fixed: Optional[List[Dict[str, Any]]] = None
+    locks: Optional[List[Dict[str, Any]]] = None
+    year: int = Field(2025, ge=2000, le=2100)
+    month: int = Field(10, ge=1, le=12)
+    alternatives: int = Field(1, ge=1, le=MAX_ALTERNATIVES)
 
 
-def _save_upload(upload: UploadFile, target_path: pathlib.Path) -> None:
-    with open(target_path, "wb") as handle:
-        shutil.copyfileobj(upload.file, handle)
+# Bodies are read as raw bytes and parsed in one pass (orjson, or pydantic's Rust JSON
+# parser for typed models) instead of FastAPI's json.loads + validation round trip.
+def _json_body_openapi(model: type[BaseModel]) -> Dict[str, Any]:
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": model.model_json_schema()}},
+        }
+    }
+
+
+async def _read_json_object(request: Request) -> Dict[str, Any]:
+    try:
+        body = orjson.loads(await request.body())
+    except orjson.JSONDecodeError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON payload: {exc}") from exc
+    if type(body) is not dict:
+        raise HTTPException(status_code=400, detail="Body must be a JSON object")
+    return body
+
+
+async def _read_model(request: Request, model: type[BaseModel]) -> Any:
+    try:
+        return model.model_validate_json(await request.body())
+    except ValidationError as exc:
+        errors = [{**err, "loc": ("body", *err["loc"])} for err in exc.errors(include_url=False)]
+        raise RequestValidationError(errors) from exc
+
+
+@lru_cache(maxsize=32)
+def _parse_md_file(path_str: str, mtime_ns: int, year: int, month: int) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    # mtime_ns is part of the cache key so edits to shift.md are picked up
+    text = pathlib.Path(path_str).read_text(encoding="utf-8")
+    return parse_shift_md(text, year=year, month=month)
+
+
+def _default_md_source() -> tuple[pathlib.Path, int]:
+    md_path = pathlib.Path(_SHIFT_MD_ENV) if _SHIFT_MD_ENV else DEFAULT_MD_PATH
+    try:
+        mtime_ns = md_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"shift.md not found at {md_path}") from None
+    return md_path, mtime_ns
+
+
+def _load_default_md(year: int, month: int) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    md_path, mtime_ns = _default_md_source()
+    nurses, rules = _parse_md_file(str(md_path), mtime_ns, year, month)
+    # callers get their own copy so the cached parse is never mutated
+    return copy.deepcopy(nurses), copy.deepcopy(rules)
+
+
+_CACHE_MAX_ENTRIES = 64
+# Serialized /optimize/default-md results, keyed by (md path, mtime_ns, year, month, alternatives)
+_DEFAULT_MD_RESULTS: "OrderedDict[Tuple[str, int, int, int, int], bytes]" = OrderedDict()
+# Parsed /optimize/md uploads, keyed by (blake2b digest of the upload, year, month)
+_MD_UPLOAD_PARSES: "OrderedDict[Tuple[bytes, int, int], tuple[List[Dict[str, Any]], Dict[str, Any]]]" = OrderedDict()
+
+
+def _cache_get(cache: OrderedDict, key: Any) -> Any:
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _cache_put(cache: OrderedDict, key: Any, value: Any) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > _CACHE_MAX_ENTRIES:
+        cache.popitem(last=False)
 
 
 def _load_json_form_field(raw: Optional[str]) -> Optional[Any]:
     if raw is None:
         return None
     try:
-        return json.loads(raw)
-    except json.JSONDecodeError as exc:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError as exc:
         raise HTTPException(status_code=400, detail=f"Invalid JSON payload: {exc}") from exc
 
 
+# Handlers call .get on every entry, so reject anything but a list of objects up front
+def _require_object_list(value: Any, name: str) -> List[Dict[str, Any]]:
+    if not isinstance(value, list) or not all(isinstance(a, dict) for a in value):
+        raise HTTPException(status_code=400, detail=f"{name} must be a list of objects")
+    return value
+
+
+def _require_assignment_list(value: Any, name: str) -> List[Dict[str, Any]]:
+    entries = _require_object_list(value, name)
+    # nurse_id/date/shift are used as dict keys downstream, so nested JSON values are rejected here
+    if any(isinstance(entry.get(key), (list, dict)) for entry in entries for key in ("nurse_id", "date", "shift")):
+        raise HTTPException(status_code=400, detail=f"{name} nurse_id, date and shift must be plain values")
+    return entries
+
+
+# orjson only ever produces exact dict/list instances, so `type(...) is` checks suffice.
+def _coerce_fixed(raw: Any) -> Optional[List[Any]]:
+    kind = type(raw)
+    if kind is list:
+        return _require_assignment_list(raw, "fixed_assignments")
+    if kind is dict:
+        return _require_assignment_list(raw.get("fixed") or raw.get("assignments") or [], "fixed_assignments")
+    if raw is None:
+        return None
+    raise HTTPException(status_code=400, detail="fixed_assignments must be JSON list or object")
+
+
+def _coerce_assignments(raw: Any) -> Optional[List[Any]]:
+    if type(raw) is dict:
+        raw = raw.get("assignments")
+    return _require_assignment_list(raw, "current_assignments") if type(raw) is list else None
+
+
 @app.post("/optimize")
 async def optimize(
     nurses: UploadFile = File(...),
     rules: UploadFile = File(...),
-    alternatives: int = Form(1),
+    alternatives: int = Form(1, ge=1, le=MAX_ALTERNATIVES),
 ):
     try:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmp = pathlib.Path(tmpdir)
-            npath = tmp / "nurses.csv"
-            rpath = tmp / "rules.json"
-            _save_upload(nurses, npath)
-            _save_upload(rules, rpath)
-
-            nurses_data, rules_data = load_and_validate(
-                npath,
-                rpath,
-                pathlib.Path(__file__).parents[2] / "packages/schemas",
-            )
-            alt = max(1, int(alternatives))
-            result = build_schedule(nurses_data, rules_data, alternatives=alt)
-            if result.get("status") != "OK":
-                raise HTTPException(status_code=422, detail=result)
-            return result
-    except HTTPException:
-        raise
-    except Exception as exc:
+        nurses_data, rules_data = await asyncio.to_thread(load_and_validate, nurses.file, rules.file, SCHEMA_DIR)
+        result = await asyncio.to_thread(build_schedule, nurses_data, rules_data, alternatives=alternatives)
+    except _BAD_REQUEST as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if result.get("status") != "OK":
+        raise HTTPException(status_code=422, detail=result)
+    return ORJSONResponse(result)
 
 
 @app.post("/optimize/md")
 async def optimize_from_md(
     md: UploadFile = File(...),
-    year: int = Form(2025),
-    month: int = Form(10),
-    alternatives: int = Form(1),
+    year: int = Form(2025, ge=2000, le=2100),
+    month: int = Form(10, ge=1, le=12),
+    alternatives: int = Form(1, ge=1, le=MAX_ALTERNATIVES),
 ):
     try:
-        text = (await md.read()).decode("utf-8")
-        nurses, rules = parse_shift_md(text, year=year, month=month)
-        alt = max(1, int(alternatives))
-        result = build_schedule(nurses, rules, alternatives=alt)
-        if result.get("status") != "OK":
-            raise HTTPException(status_code=422, detail=result)
-        return result
-    except HTTPException:
-        raise
-    except Exception as exc:
+        data = await md.read()
+        parse_key = (hashlib.blake2b(data, digest_size=16).digest(), year, month)
+        parsed = _cache_get(_MD_UPLOAD_PARSES, parse_key)
+        if parsed is None:
+            parsed = await asyncio.to_thread(parse_shift_md, data, year=year, month=month)
+            _cache_put(_MD_UPLOAD_PARSES, parse_key, parsed)
+        nurses, rules = copy.deepcopy(parsed)
+        result = await asyncio.to_thread(build_schedule, nurses, rules, alternatives=alternatives)
+    except _BAD_REQUEST as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if result.get("status") != "OK":
+        raise HTTPException(status_code=422, detail=result)
+    return ORJSONResponse(result)
 
 
 @app.post("/optimize/default-md")
 async def optimize_default_md(
-    year: int = 2025,
-    month: int = 10,
-    alternatives: int = 1,
+    year: int = Query(2025, ge=2000, le=2100),
+    month: int = Query(10, ge=1, le=12),
+    alternatives: int = Query(1, ge=1, le=MAX_ALTERNATIVES),
 ):
     try:
-        md_path_env = os.environ.get("SHIFT_MD_PATH")
-        md_path = pathlib.Path(md_path_env) if md_path_env else pathlib.Path(__file__).parents[2] / "shift.md"
-        if not md_path.exists():
-            raise HTTPException(status_code=404, detail=f"shift.md not found at {md_path}")
-        text = md_path.read_text(encoding="utf-8")
-        nurses, rules = parse_shift_md(text, year=year, month=month)
-        alt = max(1, int(alternatives))
-        result = build_schedule(nurses, rules, alternatives=alt)
-        if result.get("status") != "OK":
-            raise HTTPException(status_code=422, detail=result)
-        return result
-    except HTTPException:
-        raise
-    except Exception as exc:
+        md_path, mtime_ns = _default_md_source()
+        cache_key = (str(md_path), mtime_ns, year, month, alternatives)
+        cached = _cache_get(_DEFAULT_MD_RESULTS, cache_key)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+
+        nurses, rules = await asyncio.to_thread(_load_default_md, year, month)
+        result = await asyncio.to_thread(build_schedule, nurses, rules, alternatives=alternatives)
+    except _BAD_REQUEST as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if result.get("status") != "OK":
+        raise HTTPException(status_code=422, detail=result)
+    payload = orjson.dumps(result)
+    _cache_put(_DEFAULT_MD_RESULTS, cache_key, payload)
+    return Response(content=payload, media_type="application/json")
 
 
 @app.post("/optimize/with-fixed")
@@ -129,54 +305,30 @@ async def optimize_with_fixed(
     rules: UploadFile = File(...),
     fixed_assignments: Optional[str] = Form(None),
     current_assignments: Optional[str] = Form(None),
-    alternatives: int = Form(1),
+    alternatives: int = Form(1, ge=1, le=MAX_ALTERNATIVES),
 ):
     try:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmp = pathlib.Path(tmpdir)
-            npath = tmp / "nurses.csv"
-            rpath = tmp / "rules.json"
-            _save_upload(nurses, npath)
-            _save_upload(rules, rpath)
-
-            nurses_data, rules_data = load_and_validate(
-                npath,
-                rpath,
-                pathlib.Path(__file__).parents[2] / "packages/schemas",
-            )
-
-            fixed_payload_raw = _load_json_form_field(fixed_assignments)
-            if isinstance(fixed_payload_raw, dict):
-                fixed_payload = fixed_payload_raw.get("fixed") or fixed_payload_raw.get("assignments") or []
-            elif isinstance(fixed_payload_raw, list):
-                fixed_payload = fixed_payload_raw
-            elif fixed_payload_raw is None:
-                fixed_payload = None
-            else:
-                raise HTTPException(status_code=400, detail="fixed_assignments must be JSON list or object")
-
-            alt = max(1, int(alternatives))
-            result = build_schedule(
-                nurses_data,
-                rules_data,
-                fixed_assignments=fixed_payload,
-                alternatives=alt,
-            )
-
-            current_payload_raw = _load_json_form_field(current_assignments)
-            if result.get("status") != "OK" and current_payload_raw is not None:
-                if isinstance(current_payload_raw, dict):
-                    assignments_payload = current_payload_raw.get("assignments")
-                else:
-                    assignments_payload = current_payload_raw
-                if isinstance(assignments_payload, list):
-                    analysis = recheck_assignments(assignments_payload, nurses_data, rules_data)
-                    result["analysis"] = analysis
-            return result
-    except HTTPException:
-        raise
-    except Exception as exc:
+        nurses_data, rules_data = await asyncio.to_thread(load_and_validate, nurses.file, rules.file, SCHEMA_DIR)
+
+        fixed_payload = _coerce_fixed(_load_json_form_field(fixed_assignments))
+        # Parse before solving so malformed input fails fast
+        assignments_payload = _coerce_assignments(_load_json_form_field(current_assignments))
+
+        result = await asyncio.to_thread(
+            build_schedule,
+            nurses_data,
+            rules_data,
+            fixed_assignments=fixed_payload,
+            alternatives=alternatives,
+        )
+
+        # An empty schedule would only report every cell as missing
+        if result.get("status") != "OK" and assignments_payload:
+            analysis = await asyncio.to_thread(recheck_assignments, assignments_payload, nurses_data, rules_data)
+            result["analysis"] = analysis
+    except _BAD_REQUEST as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return ORJSONResponse(result)
 
 
 @app.post("/recheck")
@@ -186,113 +338,96 @@ async def recheck(
     assignments: UploadFile = File(...),
 ):
     try:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmp = pathlib.Path(tmpdir)
-            npath = tmp / "nurses.csv"
-            rpath = tmp / "rules.json"
-            apath = tmp / "assignments.json"
-            _save_upload(nurses, npath)
-            _save_upload(rules, rpath)
-            _save_upload(assignments, apath)
-
-            nurses_data, rules_data = load_and_validate(
-                npath,
-                rpath,
-                pathlib.Path(__file__).parents[2] / "packages/schemas",
-            )
-            with open(apath, "r", encoding="utf-8") as handle:
-                payload = json.load(handle)
-            if not isinstance(payload, dict) or "assignments" not in payload:
-                raise HTTPException(status_code=400, detail="assignments.json must contain {'assignments': [...]} ")
-            return recheck_assignments(payload["assignments"], nurses_data, rules_data)
-    except HTTPException:
-        raise
-    except Exception as exc:
+        nurses_data, rules_data = await asyncio.to_thread(load_and_validate, nurses.file, rules.file, SCHEMA_DIR)
+        payload = orjson.loads(assignments.file.read())
+        if not isinstance(payload, dict) or "assignments" not in payload:
+            raise HTTPException(status_code=400, detail="assignments.json must contain {'assignments': [...]} ")
+        entries = _require_assignment_list(payload["assignments"], "assignments")
+        analysis = await asyncio.to_thread(recheck_assignments, entries, nurses_data, rules_data)
+    except _BAD_REQUEST as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return ORJSONResponse(analysis)
 
 
-@app.post("/export/csv", response_class=PlainTextResponse)
-async def export_csv(body: Dict[str, Any] = Body(...)):
+@app.post("/export/csv", response_class=StreamingResponse, openapi_extra=_json_body_openapi(ExportCsvRequest))
+async def export_csv(request: Request):
+    body = await _read_json_object(request)
     try:
         if "assignments" not in body:
             raise HTTPException(status_code=400, detail="Body must contain assignments")
-        csv_text = to_csv(body["assignments"])
-        return PlainTextResponse(content=csv_text, media_type="text/csv")
-    except HTTPException:
-        raise
-    except Exception as exc:
+        # Rows are formatted while streaming, so reject bad input before the response starts
+        assignments = _require_assignment_list(body["assignments"], "assignments")
+        return StreamingResponse(iter_csv(assignments), media_type="text/csv")
+    except _BAD_REQUEST as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
-@app.post("/export/pdf")
-async def export_pdf(body: Dict[str, Any] = Body(...)):
+@app.post("/export/pdf", openapi_extra=_json_body_openapi(ExportPdfRequest))
+async def export_pdf(request: Request):
+    body = await _read_json_object(request)
     try:
         if "assignments" not in body:
             raise HTTPException(status_code=400, detail="Body must contain assignments")
-        pdf_bytes = assignments_to_pdf(
-            body["assignments"],
-            nurses=body.get("nurses"),
-            days=body.get("days"),
-            summary=body.get("summary"),
-            warnings=body.get("warnings"),
+        assignments = _require_assignment_list(body["assignments"], "assignments")
+        nurses = body.get("nurses")
+        if nurses:
+            _require_object_list(nurses, "nurses")
+        days = body.get("days")
+        if days is not None and (not isinstance(days, list) or not all(isinstance(d, str) for d in days)):
+            raise HTTPException(status_code=400, detail="days must be a list of strings")
+        summary = body.get("summary")
+        if summary is not None and not isinstance(summary, dict):
+            raise HTTPException(status_code=400, detail="summary must be an object")
+        if summary and summary.get("per_nurse"):
+            per_nurse = _require_object_list(summary["per_nurse"], "summary.per_nurse")
+            if not all(isinstance(info.get("counts"), dict) for info in per_nurse):
+                raise HTTPException(status_code=400, detail="summary.per_nurse counts must be objects")
+        warnings = body.get("warnings")
+        if warnings is not None and not isinstance(warnings, list):
+            raise HTTPException(status_code=400, detail="warnings must be a list")
+        pdf_bytes = await asyncio.to_thread(
+            assignments_to_pdf,
+            assignments,
+            nurses=nurses,
+            days=days,
+            summary=summary,
+            warnings=warnings,
         )
         return Response(
             content=pdf_bytes,
             media_type="application/pdf",
             headers={"Content-Disposition": "attachment; filename=assignments.pdf"},
         )
-    except HTTPException:
-        raise
-    except Exception as exc:
+    except _BAD_REQUEST as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
-@app.post("/recommend")
-async def recommend(body: Dict[str, Any] = Body(...)):
+@app.post("/recommend", openapi_extra=_json_body_openapi(RecommendRequest))
+async def recommend(request: Request):
+    body: RecommendRequest = await _read_model(request, RecommendRequest)
     try:
-        assignments = body.get("assignments")
-        if not isinstance(assignments, list):
-            raise HTTPException(status_code=400, detail="assignments must be provided as a list")
-        year = int(body.get("year") or 2025)
-        month = int(body.get("month") or 10)
-        md_path_env = os.environ.get("SHIFT_MD_PATH")
-        md_path = pathlib.Path(md_path_env) if md_path_env else pathlib.Path(__file__).parents[2] / "shift.md"
-        if not md_path.exists():
-            raise HTTPException(status_code=404, detail=f"shift.md not found at {md_path}")
-        text = md_path.read_text(encoding="utf-8")
-        nurses, rules = parse_shift_md(text, year=year, month=month)
-        return recheck_assignments(assignments, nurses, rules)
-    except HTTPException:
-        raise
-    except Exception as exc:
+        assignments = _require_assignment_list(body.assignments, "assignments")
+        nurses, rules = await asyncio.to_thread(_load_default_md, body.year, body.month)
+        analysis = await asyncio.to_thread(recheck_assignments, assignments, nurses, rules)
+    except _BAD_REQUEST as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return ORJSONResponse(analysis)
 
 
-@app.post("/reoptimize")
-async def reoptimize(body: Dict[str, Any] = Body(...)):
+@app.post("/reoptimize", openapi_extra=_json_body_openapi(ReoptimizeRequest))
+async def reoptimize(request: Request):
+    body: ReoptimizeRequest = await _read_model(request, ReoptimizeRequest)
     try:
-        assignments = body.get("assignments")
-        fixed = body.get("fixed") or body.get("locks") or []
-        year = int(body.get("year") or 2025)
-        month = int(body.get("month") or 10)
-        alt = max(1, int(body.get("alternatives") or 1))
-
-        md_path_env = os.environ.get("SHIFT_MD_PATH")
-        md_path = pathlib.Path(md_path_env) if md_path_env else pathlib.Path(__file__).parents[2] / "shift.md"
-        if not md_path.exists():
-            raise HTTPException(status_code=404, detail=f"shift.md not found at {md_path}")
-        text = md_path.read_text(encoding="utf-8")
-        nurses, rules = parse_shift_md(text, year=year, month=month)
-
-        if not isinstance(fixed, list):
-            raise HTTPException(status_code=400, detail="fixed must be a list of assignments")
-
-        result = build_schedule(nurses, rules, fixed_assignments=fixed, alternatives=alt)
-        if result.get("status") != "OK" and isinstance(assignments, list):
-            analysis = recheck_assignments(assignments, nurses, rules)
+        fixed = _require_assignment_list(body.fixed or body.locks or [], "fixed")
+        nurses, rules = await asyncio.to_thread(_load_default_md, body.year, body.month)
+
+        result = await asyncio.to_thread(
+            build_schedule, nurses, rules, fixed_assignments=fixed, alternatives=body.alternatives
+        )
+        if result.get("status") != "OK" and body.assignments is not None:
+            assignments = _require_assignment_list(body.assignments, "assignments")
+            analysis = await asyncio.to_thread(recheck_assignments, assignments, nurses, rules)
             result["analysis"] = analysis
-        return result
-    except HTTPException:
-        raise
-    except Exception as exc:
+    except _BAD_REQUEST as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return ORJSONResponse(result)
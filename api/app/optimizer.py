@@ -2,38 +2,54 @@ from __future__ import annotations
 
 import calendar
 import datetime as dt
-from collections import Counter, defaultdict
-from typing import Any, Callable, DefaultDict, Dict, Iterable, List, Literal, Optional, Tuple
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, DefaultDict, Dict, Iterable, Iterator, List, Literal, NamedTuple, Optional, Tuple
 
+import numpy as np
 from ortools.sat.python import cp_model
 
 Shift = Literal["DAY", "LATE", "NIGHT", "OFF"]
 WORK_SHIFTS: Tuple[Shift, ...] = ("DAY", "LATE", "NIGHT")
 ALL_SHIFTS: Tuple[Shift, ...] = ("DAY", "LATE", "NIGHT", "OFF")
-ValueCallback = Callable[[str, dt.date, Shift], int]
+# Position of each shift along the last axis of the decision variable array
+DAY, LATE, NIGHT, OFF = range(len(ALL_SHIFTS))
+SHIFT_CODE: Dict[str, int] = {shift: idx for idx, shift in enumerate(ALL_SHIFTS)}
+# Teams that must each staff exactly one night shift per day
+NIGHT_TEAMS: Tuple[str, ...] = ("A", "B", "ER")
+NIGHT_TEAM_CODE: Dict[str, int] = {team: idx for idx, team in enumerate(NIGHT_TEAMS)}
+# Nurse capability flag that must not be False for a shift to be assignable
+SHIFT_CAPABILITY: Dict[str, str] = {"DAY": "day_ok", "LATE": "late_ok", "NIGHT": "night_ok"}
+
+
+@lru_cache(maxsize=32)
+def _month_days(year: int, month: int) -> Tuple[dt.date, ...]:
+    _, last = calendar.monthrange(year, month)
+    return tuple(dt.date(year, month, d) for d in range(1, last + 1))
 
 
 def days_in_month(year: int, month: int) -> List[dt.date]:
-    _, last = calendar.monthrange(year, month)
-    return [dt.date(year, month, d) for d in range(1, last + 1)]
+    return list(_month_days(year, month))
 
 
 def is_weekend(date_obj: dt.date) -> bool:
     return date_obj.weekday() >= 5
 
 
-def is_weekend_or_holiday(date_obj: dt.date, holidays: set[dt.date]) -> bool:
-    return is_weekend(date_obj) or date_obj in holidays
-
-
 def week_key(date_obj: dt.date) -> Tuple[int, int]:
     iso = date_obj.isocalendar()
     return (iso.year, iso.week)
 
 
-def _demand_for_day(rules: Dict[str, Any], date_obj: dt.date, holidays: set[dt.date]) -> Dict[str, int]:
+def _demand_for_day(
+    rules: Dict[str, Any],
+    date_obj: dt.date,
+    holidays: set[dt.date],
+    key: Optional[str] = None,
+) -> Dict[str, int]:
     overrides = rules.get("demand", {})
-    key = date_obj.isoformat()
+    if key is None:
+        key = date_obj.isoformat()
     if key in overrides:
         picked = overrides[key]
     else:
@@ -54,6 +70,31 @@ def _demand_for_day(rules: Dict[str, Any], date_obj: dt.date, holidays: set[dt.d
     }
 
 
+class DayInfo(NamedTuple):
+    date: dt.date
+    iso: str
+    weekend: bool
+    holiday: bool
+    weekend_holiday: bool
+    demand: Dict[str, int]
+
+
+def _day_infos(rules: Dict[str, Any], all_days: List[dt.date], holidays: set[dt.date]) -> List[DayInfo]:
+    # Weekend/holiday flags as masks indexed by day offset into the month
+    first = all_days[0].toordinal() if all_days else 0
+    holiday_mask = np.zeros(len(all_days), dtype=bool)
+    for holiday in holidays:
+        offset = holiday.toordinal() - first
+        if 0 <= offset < len(all_days):
+            holiday_mask[offset] = True
+    weekend_mask = np.array([day.weekday() >= 5 for day in all_days], dtype=bool)
+    infos: List[DayInfo] = []
+    for day, weekend, holiday in zip(all_days, weekend_mask.tolist(), holiday_mask.tolist()):
+        iso = day.isoformat()
+        infos.append(DayInfo(day, iso, weekend, holiday, weekend or holiday, _demand_for_day(rules, day, holidays, iso)))
+    return infos
+
+
 def _prepare_merged_rules(
     nurse_ids: Iterable[str],
     nurse_by_id: Dict[str, Dict[str, Any]],
@@ -63,11 +104,17 @@ def _prepare_merged_rules(
     for nid in nurse_ids:
         base = nurse_by_id[nid]
         pr = person_rules.get(nid, {})
+        week_max = pr.get("week_max_days")
+        if week_max is None:
+            week_max = base.get("week_max_days")
+        weekend_cap = pr.get("weekend_cap_per_month")
+        if weekend_cap is None:
+            weekend_cap = base.get("weekend_cap")
         merged[nid] = {
             "night_min": pr.get("night_min"),
             "night_max": pr.get("night_max"),
-            "week_max_days": pr.get("week_max_days", base.get("week_max_days")),
-            "weekend_cap": pr.get("weekend_cap_per_month", base.get("weekend_cap")),
+            "week_max_days": week_max,
+            "weekend_cap": weekend_cap,
             "weekend_off": bool(pr.get("weekend_off")),
             "holiday_off": bool(pr.get("holiday_off")),
             "only_night": bool(pr.get("only_night")),
@@ -78,10 +125,6 @@ def _prepare_merged_rules(
             "weekend_only_night": bool(pr.get("weekend_only_night")),
             "cannot_lead_night": bool(pr.get("cannot_lead_night")),
         }
-        if merged[nid]["week_max_days"] is None and base.get("week_max_days") is not None:
-            merged[nid]["week_max_days"] = base.get("week_max_days")
-        if merged[nid]["weekend_cap"] is None and base.get("weekend_cap") is not None:
-            merged[nid]["weekend_cap"] = base.get("weekend_cap")
         if merged[nid]["only_day"]:
             base["night_ok"] = False
             base["late_ok"] = False
@@ -93,149 +136,183 @@ def _prepare_merged_rules(
 
 def _apply_fixed_assignments(
     model: cp_model.CpModel,
-    x: Dict[Tuple[str, dt.date, Shift], cp_model.IntVar],
+    X: np.ndarray,
     fixed_assignments: Optional[List[Dict[str, Any]]],
-    nurse_ids: Iterable[str],
-    all_days: List[dt.date],
+    nid_idx: Dict[str, int],
+    day_info: List[DayInfo],
 ) -> Dict[Tuple[str, str], Shift]:
     locked_map: Dict[Tuple[str, str], Shift] = {}
     if not fixed_assignments:
         return locked_map
-    day_lookup = {d.isoformat(): d for d in all_days}
-    valid_nids = set(nurse_ids)
+    day_lookup = {info.iso: d for d, info in enumerate(day_info)}
     for item in fixed_assignments:
         nid = str(item.get("nurse_id"))
         date_str = str(item.get("date"))
         shift = str(item.get("shift", "")).upper()
-        if nid not in valid_nids or date_str not in day_lookup or shift not in ALL_SHIFTS:
+        if nid not in nid_idx or date_str not in day_lookup or shift not in ALL_SHIFTS:
             continue
-        day = day_lookup[date_str]
+        n, d = nid_idx[nid], day_lookup[date_str]
         locked_map[(nid, date_str)] = shift  # type: ignore[assignment]
-        model.Add(x[(nid, day, shift)] == 1)
-        for other in ALL_SHIFTS:
-            if other != shift:
-                model.Add(x[(nid, day, other)] == 0)
+        picked = ALL_SHIFTS.index(shift)  # type: ignore[arg-type]
+        for s in range(len(ALL_SHIFTS)):
+            model.Add(X[n, d, s] == (1 if s == picked else 0))
     return locked_map
 
 
-def _extract_schedule(nurse_ids: Iterable[str], all_days: List[dt.date], shifts: Iterable[Shift], value_cb: ValueCallback) -> List[Dict[str, Any]]:
+def _extract_schedule(nurse_ids: Iterable[str], iso_days: List[str], picks: np.ndarray) -> List[Dict[str, Any]]:
     schedule: List[Dict[str, Any]] = []
-    for nid in nurse_ids:
-        for day in all_days:
-            for shift in shifts:
-                if value_cb(nid, day, shift):
-                    schedule.append({
-                        "nurse_id": nid,
-                        "date": day.isoformat(),
-                        "shift": shift,
-                    })
-                    break
+    for nid, row in zip(nurse_ids, picks.tolist()):
+        for iso, code in zip(iso_days, row):
+            schedule.append({
+                "nurse_id": nid,
+                "date": iso,
+                "shift": ALL_SHIFTS[code],
+            })
     return schedule
 
 
+def _capability_matrix(nurse_ids: List[str], nurse_by_id: Dict[str, Dict[str, Any]]) -> np.ndarray:
+    # (nurse, work shift) flags; a missing *_ok field means the nurse can take the shift
+    return np.array(
+        [[nurse_by_id[nid].get(SHIFT_CAPABILITY[shift]) is not False for shift in WORK_SHIFTS] for nid in nurse_ids],
+        dtype=bool,
+    ).reshape(len(nurse_ids), len(WORK_SHIFTS))
+
+
+class ShiftGrid(NamedTuple):
+    nurse_ids: List[str]
+    codes: np.ndarray  # (nurse, day) shift code, -1 where nothing is assigned
+    listed: np.ndarray  # nurse has at least one entry in the schedule
+    capable: np.ndarray  # (nurse, work shift) capability flags
+    team: np.ndarray  # NIGHT_TEAMS index, -1 for any other team
+    rank: np.ndarray  # position of the nurse id in sorted order
+
+
+# Cost of moving a nurse to a short shift, by target shift then current shift; -1 = not a candidate
+SHORTAGE_SCORES = np.array(
+    [
+        [-1, 1, 2, 0],  # DAY
+        [1, -1, 2, 0],  # LATE
+        [1, 2, -1, 0],  # NIGHT
+    ],
+    dtype=np.int64,
+)
+
+
 def _candidate_pool_for_shortage(
     date_key: str,
+    day: int,
     shift: Shift,
-    assign_lookup: DefaultDict[str, Dict[str, Shift]],
-    nurse_by_id: Dict[str, Dict[str, Any]],
+    grid: ShiftGrid,
     locked_map: Dict[Tuple[str, str], Shift],
     missing_team: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
+    code = SHIFT_CODE[shift]
+    current = grid.codes[:, day]
+    current = np.where(current < 0, OFF, current)
+    scores = SHORTAGE_SCORES[code][current]
+    mask = grid.listed & grid.capable[:, code] & (scores >= 0)
+    if code == NIGHT and missing_team:
+        mask &= grid.team == NIGHT_TEAM_CODE.get(missing_team, -1)
+    picks = np.flatnonzero(mask)
+    locked = np.array([(grid.nurse_ids[n], date_key) in locked_map for n in picks], dtype=bool)
+    order = np.lexsort((grid.rank[picks], locked, scores[picks]))
     candidates: List[Dict[str, Any]] = []
-    for nid, day_assignments in assign_lookup.items():
-        current_shift = day_assignments.get(date_key, "OFF")
-        nurse = nurse_by_id[nid]
-        locked = (nid, date_key) in locked_map
-        score = 0
-        if shift == "DAY":
-            if nurse.get("day_ok") is False:
-                continue
-            if current_shift == "OFF":
-                score = 0
-            elif current_shift == "LATE":
-                score = 1
-            elif current_shift == "DAY":
-                continue
-            else:
-                score = 2
-        elif shift == "LATE":
-            if nurse.get("late_ok") is False:
-                continue
-            if current_shift == "OFF":
-                score = 0
-            elif current_shift == "DAY":
-                score = 1
-            elif current_shift == "LATE":
-                continue
-            else:
-                score = 2
-        else:  # NIGHT
-            if nurse.get("night_ok") is False:
-                continue
-            if missing_team and nurse.get("team") != missing_team:
-                continue
-            if current_shift == "OFF":
-                score = 0
-            elif current_shift == "DAY":
-                score = 1
-            elif current_shift == "LATE":
-                score = 2
-            elif current_shift == "NIGHT":
-                continue
-            else:
-                score = 3
+    for n, is_locked in zip(picks[order].tolist(), locked[order].tolist()):
+        nid = grid.nurse_ids[n]
         candidates.append({
             "nurse_id": nid,
-            "current_shift": current_shift,
+            "current_shift": ALL_SHIFTS[current[n]],
             "suggested_shift": shift,
-            "locked": locked,
+            "locked": is_locked,
             "reason": f"{date_key} {shift} 不足補充候補",
-            "score": (score, locked, nid),
+            "score": (int(scores[n]), is_locked, nid),
         })
-    candidates.sort(key=lambda c: c["score"])
     return candidates
 
 
 def _candidate_pool_for_excess(
     date_key: str,
+    day: int,
     shift: Shift,
-    assign_lookup: DefaultDict[str, Dict[str, Shift]],
-    nurse_by_id: Dict[str, Dict[str, Any]],
+    grid: ShiftGrid,
     locked_map: Dict[Tuple[str, str], Shift],
 ) -> List[Dict[str, Any]]:
+    picks = np.flatnonzero(grid.codes[:, day] == SHIFT_CODE[shift])
+    locked = np.array([(grid.nurse_ids[n], date_key) in locked_map for n in picks], dtype=bool)
+    order = np.lexsort((grid.rank[picks], locked))
     candidates: List[Dict[str, Any]] = []
-    for nid, day_assignments in assign_lookup.items():
-        current_shift = day_assignments.get(date_key)
-        if current_shift != shift:
-            continue
-        locked = (nid, date_key) in locked_map
+    for n, is_locked in zip(picks[order].tolist(), locked[order].tolist()):
+        nid = grid.nurse_ids[n]
         candidates.append({
             "nurse_id": nid,
-            "current_shift": current_shift,
+            "current_shift": shift,
             "suggested_shift": "OFF" if shift != "OFF" else "DAY",
-            "locked": locked,
+            "locked": is_locked,
             "reason": f"{date_key} {shift} 過多調整候補",
-            "score": (locked, nid),
+            "score": (is_locked, nid),
         })
-    candidates.sort(key=lambda c: c["score"])
     return candidates
 
 
 def _analyze_schedule(
     schedule: List[Dict[str, Any]],
     nurses: List[Dict[str, Any]],
-    rules: Dict[str, Any],
     merged_rules: Dict[str, Dict[str, Any]],
-    all_days: List[dt.date],
-    holidays: set[dt.date],
+    day_info: List[DayInfo],
     nurse_by_id: Dict[str, Dict[str, Any]],
     locked_map: Dict[Tuple[str, str], Shift],
 ) -> Dict[str, Any]:
-    per_day_assignments: DefaultDict[str, List[Dict[str, Any]]] = defaultdict(list)
-    assign_lookup: DefaultDict[str, Dict[str, Shift]] = defaultdict(dict)
+    nurse_ids = [str(n["id"]) for n in nurses]
+    nurse_pos = {nid: n for n, nid in enumerate(nurse_ids)}
+    day_pos = {info.iso: d for d, info in enumerate(day_info)}
+    codes = np.full((len(nurse_ids), len(day_info)), -1, dtype=np.int8)
+    listed = np.zeros(len(nurse_ids), dtype=bool)
+    entry_days: List[int] = []
+    entry_shifts: List[int] = []
+    entry_nurses: List[int] = []
     for entry in schedule:
-        per_day_assignments[entry["date"]].append(entry)
-        assign_lookup[entry["nurse_id"]][entry["date"]] = entry["shift"]  # type: ignore[index]
+        n = nurse_pos.get(entry["nurse_id"], -1)
+        if n >= 0:
+            listed[n] = True
+        d = day_pos.get(entry["date"])
+        code = SHIFT_CODE.get(entry["shift"])
+        if d is not None and code is not None:
+            entry_days.append(d)
+            entry_shifts.append(code)
+            entry_nurses.append(n)
+            if n >= 0:
+                codes[n, d] = code
+
+    team = np.array(
+        [NIGHT_TEAM_CODE.get(nurse_by_id[nid].get("team"), -1) for nid in nurse_ids], dtype=np.intp
+    )
+    capable = _capability_matrix(nurse_ids, nurse_by_id)
+    rank = np.empty(len(nurse_ids), dtype=np.intp)
+    rank[sorted(range(len(nurse_ids)), key=nurse_ids.__getitem__)] = np.arange(len(nurse_ids))
+    grid = ShiftGrid(nurse_ids, codes, listed, capable, team, rank)
+
+    # Count every entry (duplicates included) per (shift, day) and per (team, day) for nights
+    days_arr = np.array(entry_days, dtype=np.intp)
+    shifts_arr = np.array(entry_shifts, dtype=np.intp)
+    nurses_arr = np.array(entry_nurses, dtype=np.intp)
+    teams_arr = np.where(nurses_arr >= 0, team[nurses_arr], -1)
+    filled = np.zeros((len(ALL_SHIFTS), len(day_info)), dtype=np.int64)
+    np.add.at(filled, (shifts_arr, days_arr), 1)
+    team_nights = (shifts_arr == NIGHT) & (teams_arr >= 0)
+    night_by_team = np.zeros((len(NIGHT_TEAMS), len(day_info)), dtype=np.int64)
+    np.add.at(night_by_team, (teams_arr[team_nights], days_arr[team_nights]), 1)
+    filled_rows = filled.tolist()
+
+    # Shortfall/excess against each day's demand for every shift in one pass
+    demand = np.array(
+        [[info.demand[k] for k in ("day_min", "day_max", "late", "night")] for info in day_info], dtype=np.int64
+    ).reshape(len(day_info), 4)
+    day_deficit = (demand[:, 0] - filled[DAY]).tolist()
+    day_excess = (filled[DAY] - demand[:, 1]).tolist()
+    late_diff = (filled[LATE] - demand[:, 2]).tolist()
+    night_diff = (filled[NIGHT] - demand[:, 3]).tolist()
+    teams_missing = (night_by_team < 1).T.tolist()
 
     per_day_summary: List[Dict[str, Any]] = []
     warnings: List[str] = []
@@ -243,17 +320,16 @@ def _analyze_schedule(
     violation_cells: List[Dict[str, Any]] = []
     recommendations: List[Dict[str, Any]] = []
 
-    for day in all_days:
-        key = day.isoformat()
-        day_items = per_day_assignments[key]
-        counts = Counter(item["shift"] for item in day_items)
-        dem = _demand_for_day(rules, day, holidays)
+    for d, info in enumerate(day_info):
+        key = info.iso
+        counts = {shift: filled_rows[code][d] for code, shift in enumerate(WORK_SHIFTS)}
+        dem = info.demand
         per_day_summary.append(
             {
                 "date": key,
-                "weekday": day.strftime("%a"),
-                "is_weekend": is_weekend(day),
-                "is_holiday": day in holidays,
+                "weekday": info.date.strftime("%a"),
+                "is_weekend": info.weekend,
+                "is_holiday": info.holiday,
                 "requirements": dem,
                 "filled": {
                     "DAY": counts.get("DAY", 0),
@@ -263,8 +339,8 @@ def _analyze_schedule(
             }
         )
 
-        if counts.get("DAY", 0) < dem["day_min"]:
-            deficit = dem["day_min"] - counts.get("DAY", 0)
+        if day_deficit[d] > 0:
+            deficit = day_deficit[d]
             violation = {
                 "date": key,
                 "shift": "DAY",
@@ -277,7 +353,7 @@ def _analyze_schedule(
             }
             violations.append(violation)
             violation_cells.append({"date": key, "shift": "DAY", "kind": "shortage"})
-            candidates = _candidate_pool_for_shortage(key, "DAY", assign_lookup, nurse_by_id, locked_map)
+            candidates = _candidate_pool_for_shortage(key, d, "DAY", grid, locked_map)
             if candidates:
                 recommendations.append({
                     "date": key,
@@ -288,8 +364,8 @@ def _analyze_schedule(
                         {k: v for k, v in cand.items() if k != "score"} for cand in candidates[: max(3, deficit)]
                     ],
                 })
-        if counts.get("DAY", 0) > dem["day_max"]:
-            excess = counts.get("DAY", 0) - dem["day_max"]
+        if day_excess[d] > 0:
+            excess = day_excess[d]
             violation = {
                 "date": key,
                 "shift": "DAY",
@@ -302,7 +378,7 @@ def _analyze_schedule(
             }
             violations.append(violation)
             violation_cells.append({"date": key, "shift": "DAY", "kind": "excess"})
-            candidates = _candidate_pool_for_excess(key, "DAY", assign_lookup, nurse_by_id, locked_map)
+            candidates = _candidate_pool_for_excess(key, d, "DAY", grid, locked_map)
             if candidates:
                 recommendations.append({
                     "date": key,
@@ -313,8 +389,8 @@ def _analyze_schedule(
                         {k: v for k, v in cand.items() if k != "score"} for cand in candidates[: max(3, excess)]
                     ],
                 })
-        if counts.get("LATE", 0) != dem["late"]:
-            diff = counts.get("LATE", 0) - dem["late"]
+        if late_diff[d]:
+            diff = late_diff[d]
             violation = {
                 "date": key,
                 "shift": "LATE",
@@ -327,9 +403,9 @@ def _analyze_schedule(
             violations.append(violation)
             violation_cells.append({"date": key, "shift": "LATE", "kind": violation["kind"]})
             if diff < 0:
-                candidates = _candidate_pool_for_shortage(key, "LATE", assign_lookup, nurse_by_id, locked_map)
+                candidates = _candidate_pool_for_shortage(key, d, "LATE", grid, locked_map)
             else:
-                candidates = _candidate_pool_for_excess(key, "LATE", assign_lookup, nurse_by_id, locked_map)
+                candidates = _candidate_pool_for_excess(key, d, "LATE", grid, locked_map)
             if candidates:
                 recommendations.append({
                     "date": key,
@@ -340,8 +416,8 @@ def _analyze_schedule(
                         {k: v for k, v in cand.items() if k != "score"} for cand in candidates[:3]
                     ],
                 })
-        if counts.get("NIGHT", 0) != dem["night"]:
-            diff = counts.get("NIGHT", 0) - dem["night"]
+        if night_diff[d]:
+            diff = night_diff[d]
             violation = {
                 "date": key,
                 "shift": "NIGHT",
@@ -353,21 +429,14 @@ def _analyze_schedule(
             }
             violations.append(violation)
             violation_cells.append({"date": key, "shift": "NIGHT", "kind": violation["kind"]})
-            missing_teams: List[str] = []
             if diff < 0:
-                team_counts = Counter(
-                    nurse_by_id[item["nurse_id"]]["team"] for item in day_items if item["shift"] == "NIGHT"
-                )
-                expected = {"A": 1, "B": 1, "ER": 1}
-                for team, need in expected.items():
-                    if team_counts.get(team, 0) < need:
-                        missing_teams.extend([team] * (need - team_counts.get(team, 0)))
+                missing_teams = [team for team, missing in zip(NIGHT_TEAMS, teams_missing[d]) if missing]
                 if missing_teams:
                     violation["missing_teams"] = missing_teams
                 cand_list: List[Dict[str, Any]] = []
                 for miss_team in missing_teams or [None]:
                     cand_list.extend(
-                        _candidate_pool_for_shortage(key, "NIGHT", assign_lookup, nurse_by_id, locked_map, miss_team)
+                        _candidate_pool_for_shortage(key, d, "NIGHT", grid, locked_map, miss_team)
                     )
                 if cand_list:
                     recommendations.append({
@@ -381,7 +450,7 @@ def _analyze_schedule(
                         ],
                     })
             else:
-                candidates = _candidate_pool_for_excess(key, "NIGHT", assign_lookup, nurse_by_id, locked_map)
+                candidates = _candidate_pool_for_excess(key, d, "NIGHT", grid, locked_map)
                 if candidates:
                     recommendations.append({
                         "date": key,
@@ -393,20 +462,19 @@ def _analyze_schedule(
                         ],
                     })
 
-    nurse_ids = [str(n["id"]) for n in nurses]
+    weekend_mask = np.array([info.weekend_holiday for info in day_info], dtype=bool)
+    weekend_codes = codes[:, weekend_mask]
+    shift_totals = np.stack([(codes == code).sum(axis=1) for code in range(len(ALL_SHIFTS))], axis=1).tolist()
+    weekend_work = ((weekend_codes >= 0) & (weekend_codes < OFF)).sum(axis=1).tolist()
+
     per_nurse_summary: List[Dict[str, Any]] = []
-    for nid in nurse_ids:
+    for n, nid in enumerate(nurse_ids):
         meta = nurse_by_id[nid]
         rule = merged_rules[nid]
-        counts = Counter(assign_lookup[nid].values())
-        weekend_days = sum(
-            1
-            for day in all_days
-            if assign_lookup[nid].get(day.isoformat()) in WORK_SHIFTS
-            and is_weekend_or_holiday(day, holidays)
-        )
-        night_count = counts.get("NIGHT", 0)
-        work_days = sum(counts.get(shift, 0) for shift in WORK_SHIFTS)
+        counts = dict(zip(ALL_SHIFTS, shift_totals[n]))
+        weekend_days = weekend_work[n]
+        night_count = counts["NIGHT"]
+        work_days = sum(counts[shift] for shift in WORK_SHIFTS)
         per_nurse_summary.append(
             {
                 "nurse_id": nid,
@@ -452,6 +520,10 @@ def build_schedule(
     *,
     fixed_assignments: Optional[List[Dict[str, Any]]] = None,
     alternatives: int = 1,
+    workers: int = 8,
+    probing_level: Optional[int] = None,
+    linearization_level: Optional[int] = None,
+    core_minimization_level: Optional[int] = None,
 ) -> Dict[str, Any]:
     year = int(rules["year"])
     month = int(rules["month"])
@@ -460,6 +532,7 @@ def build_schedule(
     forbidden_night_pairs = [tuple(pair) for pair in rules.get("forbidden_pairs", {}).get("night", [])]
 
     all_days = days_in_month(year, month)
+    day_info = _day_infos(rules, all_days, holidays)
     nurse_ids = [str(n["id"]) for n in nurses]
     nurses_mutable = [{**n} for n in nurses]
     nurse_by_id = {str(n["id"]): nurses_mutable[idx] for idx, n in enumerate(nurses_mutable)}
@@ -467,136 +540,138 @@ def build_schedule(
     merged_rules = _prepare_merged_rules(nurse_ids, nurse_by_id, person_rules)
 
     model = cp_model.CpModel()
-    x: Dict[Tuple[str, dt.date, Shift], cp_model.IntVar] = {}
-    for nid in nurse_ids:
-        for day in all_days:
-            for shift in ALL_SHIFTS:
-                x[(nid, day, shift)] = model.NewBoolVar(f"x_{nid}_{day.isoformat()}_{shift}")
+    num_days = len(all_days)
+    X = np.empty((len(nurse_ids), num_days, len(ALL_SHIFTS)), dtype=object)
+    for n, nid in enumerate(nurse_ids):
+        for d, info in enumerate(day_info):
+            for s, shift in enumerate(ALL_SHIFTS):
+                X[n, d, s] = model.NewBoolVar(f"x_{nid}_{info.iso}_{shift}")
+    var_index = np.array([var.Index() for var in X.ravel().tolist()], dtype=np.intp).reshape(X.shape)
+
+    for n in range(len(nurse_ids)):
+        for d in range(num_days):
+            model.Add(cp_model.LinearExpr.Sum(X[n, d].tolist()) == 1)
+
+    nid_idx = {nid: n for n, nid in enumerate(nurse_ids)}
+    locked_map = _apply_fixed_assignments(model, X, fixed_assignments, nid_idx, day_info)
+
+    week_to_days: DefaultDict[Tuple[int, int], List[int]] = defaultdict(list)
+    weekend_idx: List[int] = []
+    holiday_idx: List[int] = []
+    weekday_idx: List[int] = []
+    for d, info in enumerate(day_info):
+        week_to_days[week_key(info.date)].append(d)
+        if info.holiday:
+            holiday_idx.append(d)
+        (weekend_idx if info.weekend_holiday else weekday_idx).append(d)
+
+    team_idx = {
+        team: np.array([n for n, nid in enumerate(nurse_ids) if nurse_by_id[nid]["team"] == team], dtype=np.intp)
+        for team in NIGHT_TEAMS
+    }
+    leader_idx = np.array(
+        [
+            n for n, nid in enumerate(nurse_ids)
+            if nurse_by_id[nid].get("leader_ok") and not merged_rules[nid].get("cannot_lead_night")
+        ],
+        dtype=np.intp,
+    )
+    weekend_leader_idx = np.array(
+        [n for n, nid in enumerate(nurse_ids) if nid in leader_weekend_candidates], dtype=np.intp
+    )
 
-    for nid in nurse_ids:
-        for day in all_days:
-            model.Add(sum(x[(nid, day, shift)] for shift in ALL_SHIFTS) == 1)
-
-    locked_map = _apply_fixed_assignments(model, x, fixed_assignments, nurse_ids, all_days)
-
-    week_to_days: DefaultDict[Tuple[int, int], List[dt.date]] = defaultdict(list)
-    for day in all_days:
-        week_to_days[week_key(day)].append(day)
-    weekend_dates = [day for day in all_days if is_weekend_or_holiday(day, holidays)]
-    holiday_dates = [day for day in all_days if day in holidays]
-
-    for day in all_days:
-        dem = _demand_for_day(rules, day, holidays)
-        model.Add(sum(x[(nid, day, "DAY")] for nid in nurse_ids) >= dem["day_min"])
-        model.Add(sum(x[(nid, day, "DAY")] for nid in nurse_ids) <= dem["day_max"])
-        model.Add(sum(x[(nid, day, "LATE")] for nid in nurse_ids) == dem["late"])
-        model.Add(sum(x[(nid, day, "NIGHT")] for nid in nurse_ids) == dem["night"])
-
-        night_A = [x[(nid, day, "NIGHT")] for nid in nurse_ids if nurse_by_id[nid]["team"] == "A"]
-        night_B = [x[(nid, day, "NIGHT")] for nid in nurse_ids if nurse_by_id[nid]["team"] == "B"]
-        night_ER = [x[(nid, day, "NIGHT")] for nid in nurse_ids if nurse_by_id[nid]["team"] == "ER"]
-        if night_A:
-            model.Add(sum(night_A) == 1)
-        if night_B:
-            model.Add(sum(night_B) == 1)
-        if night_ER:
-            model.Add(sum(night_ER) == 1)
-
-        if is_weekend(day) or (day in holidays):
-            model.Add(
-                sum(x[(nid, day, "DAY")] for nid in nurse_ids if nid in leader_weekend_candidates) >= 1
-            )
-
-        for a, b in forbidden_night_pairs:
-            if a in nurse_ids and b in nurse_ids:
-                model.Add(x[(a, day, "NIGHT")] + x[(b, day, "NIGHT")] <= 1)
-
-        model.Add(
-            sum(
-                x[(nid, day, "NIGHT")] for nid in nurse_ids
-                if nurse_by_id[nid].get("leader_ok") and not merged_rules[nid].get("cannot_lead_night")
-            )
-            >= 1
-        )
+    night_pairs = [(nid_idx[a], nid_idx[b]) for a, b in forbidden_night_pairs if a in nid_idx and b in nid_idx]
 
-    for nid in nurse_ids:
-        for idx in range(len(all_days) - 1):
-            current_day = all_days[idx]
-            next_day = all_days[idx + 1]
-            model.Add(x[(nid, current_day, "NIGHT")] + x[(nid, next_day, "DAY")] <= 1)
-            model.Add(x[(nid, current_day, "NIGHT")] + x[(nid, next_day, "LATE")] <= 1)
+    for d, info in enumerate(day_info):
+        dem = info.demand
+        day_col, late_col, night_col = X[:, d, DAY], X[:, d, LATE], X[:, d, NIGHT]
+        model.AddLinearConstraint(cp_model.LinearExpr.Sum(day_col.tolist()), dem["day_min"], dem["day_max"])
+        model.Add(cp_model.LinearExpr.Sum(late_col.tolist()) == dem["late"])
+        model.Add(cp_model.LinearExpr.Sum(night_col.tolist()) == dem["night"])
 
-    for nid in nurse_ids:
+        for members in team_idx.values():
+            if members.size:
+                model.Add(cp_model.LinearExpr.Sum(night_col[members].tolist()) == 1)
+
+        if info.weekend_holiday:
+            model.Add(cp_model.LinearExpr.Sum(day_col[weekend_leader_idx].tolist()) >= 1)
+
+        for a, b in night_pairs:
+            model.Add(night_col[a] + night_col[b] <= 1)
+
+        model.Add(cp_model.LinearExpr.Sum(night_col[leader_idx].tolist()) >= 1)
+
+    for n in range(len(nurse_ids)):
+        for d in range(num_days - 1):
+            model.Add(X[n, d, NIGHT] + X[n, d + 1, DAY] <= 1)
+            model.Add(X[n, d, NIGHT] + X[n, d + 1, LATE] <= 1)
+
+    for n, nid in enumerate(nurse_ids):
         rule = merged_rules[nid]
         off_target = 9 + int(rule.get("extra_holidays", 0))
-        model.Add(sum(x[(nid, day, "OFF")] for day in all_days) >= off_target)
+        model.Add(cp_model.LinearExpr.Sum(X[n, :, OFF].tolist()) >= off_target)
 
-    for nid in nurse_ids:
+    # One linear row per rule instead of one unit constraint per day
+    def forbid(cells: np.ndarray) -> None:
+        model.Add(cp_model.LinearExpr.Sum(cells.ravel().tolist()) == 0)
+
+    def require(cells: np.ndarray) -> None:
+        model.Add(cp_model.LinearExpr.Sum(cells.ravel().tolist()) == cells.size)
+
+    for n, nid in enumerate(nurse_ids):
         base = nurse_by_id[nid]
-        if base.get("day_ok") is False:
-            for day in all_days:
-                model.Add(x[(nid, day, "DAY")] == 0)
-        if base.get("late_ok") is False:
-            for day in all_days:
-                model.Add(x[(nid, day, "LATE")] == 0)
-        if base.get("night_ok") is False:
-            for day in all_days:
-                model.Add(x[(nid, day, "NIGHT")] == 0)
+        for code, shift in enumerate(WORK_SHIFTS):
+            if base.get(SHIFT_CAPABILITY[shift]) is False:
+                forbid(X[n, :, code])
 
-    for nid in nurse_ids:
+    for n, nid in enumerate(nurse_ids):
         pr = person_rules.get(nid, {})
         rule_state = merged_rules[nid]
         night_min = pr.get("night_min")
         night_max = pr.get("night_max")
         if night_min is not None:
-            model.Add(sum(x[(nid, day, "NIGHT")] for day in all_days) >= int(night_min))
+            model.Add(cp_model.LinearExpr.Sum(X[n, :, NIGHT].tolist()) >= int(night_min))
         if night_max is not None:
-            model.Add(sum(x[(nid, day, "NIGHT")] for day in all_days) <= int(night_max))
+            model.Add(cp_model.LinearExpr.Sum(X[n, :, NIGHT].tolist()) <= int(night_max))
         if pr.get("exclude_day_on_weekend"):
-            for day in all_days:
-                if is_weekend(day) or (day in holidays):
-                    model.Add(x[(nid, day, "DAY")] == 0)
+            forbid(X[n, weekend_idx, DAY])
         if pr.get("only_night"):
-            for day in all_days:
-                model.Add(x[(nid, day, "DAY")] == 0)
-                model.Add(x[(nid, day, "LATE")] == 0)
-                model.Add(x[(nid, day, "OFF")] + x[(nid, day, "NIGHT")] == 1)
+            forbid(X[n, :, DAY:NIGHT])
         if pr.get("only_day"):
-            for day in all_days:
-                model.Add(x[(nid, day, "NIGHT")] == 0)
+            forbid(X[n, :, NIGHT])
         if pr.get("month_quota_days") is not None:
             quota = int(pr["month_quota_days"])
-            model.Add(sum(x[(nid, day, "DAY")] for day in all_days) == quota)
+            model.Add(cp_model.LinearExpr.Sum(X[n, :, DAY].tolist()) == quota)
         week_cap = pr.get("week_max_days") or rule_state.get("week_max_days")
         if week_cap is not None:
             cap = int(week_cap)
             for day_list in week_to_days.values():
-                model.Add(sum(x[(nid, d, s)] for d in day_list for s in WORK_SHIFTS) <= cap)
+                model.Add(cp_model.LinearExpr.Sum(X[n, day_list, :OFF].ravel().tolist()) <= cap)
         weekend_cap = rule_state.get("weekend_cap")
         if weekend_cap is not None:
             cap = int(weekend_cap)
-            model.Add(sum(x[(nid, d, s)] for d in weekend_dates for s in WORK_SHIFTS) <= cap)
+            model.Add(cp_model.LinearExpr.Sum(X[n, weekend_idx, :OFF].ravel().tolist()) <= cap)
         if pr.get("weekend_off"):
-            for day in weekend_dates:
-                model.Add(x[(nid, day, "OFF")] == 1)
+            require(X[n, weekend_idx, OFF])
         if pr.get("holiday_off"):
-            for day in holiday_dates:
-                model.Add(x[(nid, day, "OFF")] == 1)
+            require(X[n, holiday_idx, OFF])
         if pr.get("weekend_day_only"):
-            for day in all_days:
-                if is_weekend_or_holiday(day, holidays):
-                    model.Add(x[(nid, day, "LATE")] == 0)
-                    model.Add(x[(nid, day, "NIGHT")] == 0)
-                else:
-                    model.Add(x[(nid, day, "OFF")] == 1)
+            forbid(X[n, weekend_idx, LATE:OFF])
+            require(X[n, weekday_idx, OFF])
         if pr.get("weekend_only_night"):
-            for day in all_days:
-                if not is_weekend_or_holiday(day, holidays):
-                    model.Add(x[(nid, day, "NIGHT")] == 0)
-                    model.Add(x[(nid, day, "OFF")] == 1)
+            require(X[n, weekday_idx, OFF])
 
     solver = cp_model.CpSolver()
     solver.parameters.max_time_in_seconds = 30.0
+    solver.parameters.num_workers = workers
+    # Presolve/search knobs left at CP-SAT defaults unless given: lowering them can
+    # speed up some instance shapes a lot and slow down others, so tune per workload
+    if probing_level is not None:
+        solver.parameters.cp_model_probing_level = probing_level
+    if linearization_level is not None:
+        solver.parameters.linearization_level = linearization_level
+    if core_minimization_level is not None:
+        solver.parameters.core_minimization_level = core_minimization_level
 
     nurses_meta = [
         {
@@ -609,7 +684,7 @@ def build_schedule(
     ]
 
     def assemble_solution(schedule: List[Dict[str, Any]], index: int) -> Dict[str, Any]:
-        analysis = _analyze_schedule(schedule, nurses_mutable, rules, merged_rules, all_days, holidays, nurse_by_id, locked_map)
+        analysis = _analyze_schedule(schedule, nurses_mutable, merged_rules, day_info, nurse_by_id, locked_map)
         plan_label = f"案{index + 1}"
         return {
             "plan_id": f"plan-{index + 1}",
@@ -625,59 +700,37 @@ def build_schedule(
             "recommendations": analysis["recommendations"],
         }
 
+    iso_days = [info.iso for info in day_info]
     solutions: List[Dict[str, Any]] = []
-
-    if alternatives <= 1:
+    limit = max(1, alternatives)
+    time_left = solver.parameters.max_time_in_seconds
+    while True:
         status = solver.Solve(model)
         if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-            return {
-                "status": "INFEASIBLE",
-                "message": "No feasible solution found",
-                "suggestions": suggest_relaxations(nurses, rules),
-            }
-        schedule = _extract_schedule(
-            nurse_ids,
-            all_days,
-            ALL_SHIFTS,
-            lambda nid, day, shift: solver.Value(x[(nid, day, shift)]) == 1,
-        )
-        solutions.append(assemble_solution(schedule, 0))
-    else:
-        limit = max(1, alternatives)
-
-        class Collector(cp_model.CpSolverSolutionCallback):
-            def __init__(self) -> None:
-                super().__init__()
-                self.collected: List[Dict[str, Any]] = []
-
-            def OnSolutionCallback(self) -> None:  # type: ignore[override]
-                schedule = _extract_schedule(
-                    nurse_ids,
-                    all_days,
-                    ALL_SHIFTS,
-                    lambda nid, day, shift: self.Value(x[(nid, day, shift)]) == 1,
-                )
-                self.collected.append(assemble_solution(schedule, len(self.collected)))
-                if len(self.collected) >= limit:
-                    self.StopSearch()
-
-        collector = Collector()
-        solver.parameters.enumerate_all_solutions = True
-        status = solver.SearchForAllSolutions(model, collector)
-        if not collector.collected:
-            return {
-                "status": "INFEASIBLE",
-                "message": "No feasible solution found",
-                "suggestions": suggest_relaxations(nurses, rules),
-            }
-        solutions.extend(collector.collected)
+            break
+        values = np.asarray(solver.ResponseProto().solution, dtype=np.int8)[var_index]
+        schedule = _extract_schedule(nurse_ids, iso_days, values.argmax(axis=2))
+        solutions.append(assemble_solution(schedule, len(solutions)))
+        time_left -= solver.WallTime()
+        if len(solutions) >= limit or time_left <= 0:
+            break
+        # Forbid the schedule just found so the next solve has to change at least one cell
+        model.AddBoolOr([var.Not() for var in X[values == 1].tolist()])
+        solver.parameters.max_time_in_seconds = time_left
+
+    if not solutions:
+        return {
+            "status": "INFEASIBLE",
+            "message": "No feasible solution found",
+            "suggestions": suggest_relaxations(nurses, rules),
+        }
 
     primary = solutions[0]
     result = {
         "status": "OK",
         "year": year,
         "month": month,
-        "days": [day.isoformat() for day in all_days],
+        "days": iso_days,
         "nurses": nurses_meta,
         "assignments": primary["assignments"],
         "summary": primary["summary"],
@@ -699,36 +752,8 @@ def suggest_relaxations(nurses: List[Dict[str, Any]], rules: Dict[str, Any]) ->
     holidays = {dt.date.fromisoformat(x) for x in rules.get("holidays", [])}
     all_days = days_in_month(year, month)
 
-    def demand_of(date_obj: dt.date) -> Dict[str, int]:
-        defaults = rules.get("demand_defaults", {})
-        if date_obj in holidays:
-            target = defaults.get("saturday_holiday", {})
-        elif date_obj.weekday() == 6:
-            target = defaults.get("sunday", {})
-        elif is_weekend(date_obj):
-            target = defaults.get("saturday_holiday", {})
-        else:
-            target = defaults.get("weekday", {})
-        return {
-            "day_min": int(target.get("day_min", 0)),
-            "day_max": int(target.get("day_max", 9999)),
-            "late": int(target.get("late", 0)),
-            "night": int(target.get("night", 0)),
-        }
-
-    day_capable_counts: Dict[str, int] = {}
-    for day in all_days:
-        count = 0
-        for nurse in nurses:
-            if nurse.get("day_ok") is not False:
-                count += 1
-        day_capable_counts[day.isoformat()] = count
-
-    lower_days: List[str] = []
-    for day in all_days:
-        dem = demand_of(day)
-        if day_capable_counts[day.isoformat()] < dem["day_min"]:
-            lower_days.append(day.isoformat())
+    day_capable = sum(1 for nurse in nurses if nurse.get("day_ok") is not False)
+    lower_days = [info.iso for info in _day_infos(rules, all_days, holidays) if day_capable < info.demand["day_min"]]
 
     suggestions: List[Dict[str, Any]] = []
     if lower_days:
@@ -778,42 +803,63 @@ def recheck_assignments(
     person_rules = {str(k): v for k, v in rules.get("person_rules", {}).items()}
     merged_rules = _prepare_merged_rules(nurse_ids, nurse_by_id, person_rules)
 
+    roster = list(nurse_by_id)
+    roster_pos = {nid: n for n, nid in enumerate(roster)}
+    day_keys = list(all_days)
+    day_pos = {key: d for d, key in enumerate(day_keys)}
+    capable = _capability_matrix(roster, nurse_by_id)
+
+    # Normalise each entry once; everything below works from these tuples
+    labels: List[Tuple[str, str, Any]] = [
+        (str(entry.get("nurse_id")), str(entry.get("date")), entry.get("shift")) for entry in assignments
+    ]
+    rows_arr = np.array([roster_pos.get(nid, -1) for nid, _, _ in labels], dtype=np.int64)
+    cols_arr = np.array([day_pos.get(date_key, -1) for _, date_key, _ in labels], dtype=np.int64)
+    codes_arr = np.array(
+        [SHIFT_CODE.get(shift, OFF) if isinstance(shift, str) else OFF for _, _, shift in labels], dtype=np.intp
+    )
+    unknown = rows_arr < 0
+    outside = ~unknown & (cols_arr < 0)
+    valid = ~unknown & ~outside
+
+    # Pack (nurse, day) into one key; every occurrence after the first is a duplicate
+    valid_pos = np.flatnonzero(valid)
+    cell_keys = rows_arr[valid_pos] * len(day_keys) + cols_arr[valid_pos]
+    order = np.argsort(cell_keys, kind="stable")
+    sorted_keys = cell_keys[order]
+    repeat = np.zeros(len(sorted_keys), dtype=bool)
+    repeat[1:] = sorted_keys[1:] == sorted_keys[:-1]
+    duplicate = np.zeros(len(labels), dtype=bool)
+    duplicate[valid_pos[order]] = repeat
+    incapable = np.zeros(len(labels), dtype=bool)
+    work = valid_pos[codes_arr[valid_pos] < OFF]
+    incapable[work] = ~capable[rows_arr[work], codes_arr[work]]
+
     violations_strings: List[str] = []
-    seen: DefaultDict[Tuple[str, str], int] = defaultdict(int)
-    for entry in assignments:
-        nid = str(entry.get("nurse_id"))
-        date_key = str(entry.get("date"))
-        shift = entry.get("shift")
-        if nid not in nurse_by_id:
+    for i in np.flatnonzero(~valid | duplicate | incapable).tolist():
+        nid, date_key, shift = labels[i]
+        if unknown[i]:
             violations_strings.append(f"unknown nurse_id {nid}")
             continue
-        if date_key not in all_days:
+        if outside[i]:
             violations_strings.append(f"date out of month {date_key}")
             continue
-        key = (nid, date_key)
-        seen[key] += 1
-        if seen[key] > 1:
+        if duplicate[i]:
             violations_strings.append(f"multiple shifts in a day for nurse {nid} at {date_key}")
-        nurse = nurse_by_id[nid]
-        if shift == "DAY" and nurse.get("day_ok") is False:
-            violations_strings.append(f"nurse {nid} cannot take DAY {date_key}")
-        if shift == "LATE" and nurse.get("late_ok") is False:
-            violations_strings.append(f"nurse {nid} cannot take LATE {date_key}")
-        if shift == "NIGHT" and nurse.get("night_ok") is False:
-            violations_strings.append(f"nurse {nid} cannot take NIGHT {date_key}")
-
-    for nid in nurse_by_id:
-        for date_key in all_days:
-            if (nid, date_key) not in seen:
-                violations_strings.append(f"nurse {nid} missing assignment at {date_key}")
+        if incapable[i]:
+            violations_strings.append(f"nurse {nid} cannot take {shift} {date_key}")
+
+    seen = np.zeros(len(roster) * len(day_keys), dtype=bool)
+    seen[cell_keys] = True
+    for key in np.flatnonzero(~seen).tolist():
+        n, d = divmod(key, len(day_keys))
+        violations_strings.append(f"nurse {roster[n]} missing assignment at {day_keys[d]}")
 
     analysis = _analyze_schedule(
         assignments,
         nurses_mutable,
-        rules,
         merged_rules,
-        list(all_days.values()),
-        holidays,
+        _day_infos(rules, list(all_days.values()), holidays),
         nurse_by_id,
         locked_map={},
     )
@@ -833,13 +879,29 @@ def recheck_assignments(
     }
 
 
-def to_csv(assignments: List[Dict[str, Any]]) -> str:
+def iter_csv(assignments: List[Dict[str, Any]], chunk_rows: int = 256) -> Iterator[str]:
     import csv
     import io
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["nurse_id", "date", "shift"])
-    for entry in assignments:
-        writer.writerow([entry.get("nurse_id"), entry.get("date"), entry.get("shift")])
-    return output.getvalue()
+    yield "nurse_id,date,shift\r\n"
+    for start in range(0, len(assignments), chunk_rows):
+        rows = assignments[start:start + chunk_rows]
+        text = "".join(f"{a.get('nurse_id')},{a.get('date')},{a.get('shift')}\r\n" for a in rows)
+        n = len(rows)
+        # Plain fields only; anything needing quoting (or a None) goes through csv.writer
+        if (
+            text.count(",") == 2 * n
+            and text.count("\n") == n
+            and text.count("\r") == n
+            and '"' not in text
+            and "None" not in text
+        ):
+            yield text
+            continue
+        output = io.StringIO()
+        csv.writer(output).writerows([(a.get("nurse_id"), a.get("date"), a.get("shift")) for a in rows])
+        yield output.getvalue()
+
+
+def to_csv(assignments: List[Dict[str, Any]]) -> str:
+    return "".join(iter_csv(assignments))
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfbase.cidfonts import UnicodeCIDFont
@@ -13,20 +14,24 @@ import os
 from pathlib import Path
 
 
+_FONTS_DIR = Path(__file__).parents[2] / "fonts"
+# Common locations for Noto Sans CJK
+_FONT_CANDIDATES: tuple[Path, ...] = (
+    _FONTS_DIR / "NotoSansCJKjp-Regular.otf",
+    _FONTS_DIR / "NotoSansJP-Regular.otf",
+    Path("/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc"),
+    Path("/usr/share/fonts/opentype/noto/NotoSansCJKjp-Regular.otf"),
+    Path("/usr/share/fonts/truetype/noto/NotoSansCJKjp-Regular.otf"),
+    Path("/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc"),
+)
+
+
+@lru_cache(maxsize=1)
 def _register_jp_font() -> str:
-    """Register a Japanese-capable font and return its name.
+    """Register a Japanese-capable font once per process and return its name.
     Priority: Noto Sans CJK JP if present, otherwise built-in HeiseiKakuGo-W5.
     """
-    # Common locations for Noto Sans CJK
-    candidates = [
-        Path(__file__).parents[2] / "fonts" / "NotoSansCJKjp-Regular.otf",
-        Path(__file__).parents[2] / "fonts" / "NotoSansJP-Regular.otf",
-        Path("/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc"),
-        Path("/usr/share/fonts/opentype/noto/NotoSansCJKjp-Regular.otf"),
-        Path("/usr/share/fonts/truetype/noto/NotoSansCJKjp-Regular.otf"),
-        Path("/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc"),
-    ]
-    for p in candidates:
+    for p in _FONT_CANDIDATES:
         try:
             if p.exists():
                 pdfmetrics.registerFont(TTFont("JP", str(p)))
@@ -43,6 +48,35 @@ def _register_jp_font() -> str:
         return "Helvetica"
 
 
+class _PdfContext(NamedTuple):
+    font_name: str
+    title: ParagraphStyle
+    normal: ParagraphStyle
+    heading: ParagraphStyle
+
+
+@lru_cache(maxsize=1)
+def _pdf_context() -> _PdfContext:
+    """Register the font and build the Japanese paragraph styles once per process."""
+    styles = getSampleStyleSheet()
+    font_name = _register_jp_font()
+    # Clone styles to apply Japanese font
+    title_style = styles["Title"].clone("TitleJP")
+    title_style.fontName = font_name
+    title_style.leading = 18
+    normal_style = styles["Normal"].clone("NormalJP")
+    normal_style.fontName = font_name
+    h2 = styles["Heading2"].clone("H2JP")
+    h2.fontName = font_name
+    return _PdfContext(font_name, title_style, normal_style, h2)
+
+
+def _nurse_sort_key(nurse: Dict[str, Any]) -> Tuple[Any, ...]:
+    # Numeric ids by (team, id) first, then any other ids by id string
+    nid = str(nurse.get("id"))
+    return (0, str(nurse.get("team")), int(nid)) if nid.isdigit() else (1, nid)
+
+
 def assignments_to_pdf(
     assignments: List[Dict[str, Any]],
     nurses: Optional[List[Dict[str, Any]]] = None,
@@ -59,14 +93,10 @@ def assignments_to_pdf(
         topMargin=24,
         bottomMargin=18,
     )
-    styles = getSampleStyleSheet()
-    font_name = _register_jp_font()
-    # Clone styles to apply Japanese font
-    title_style = styles["Title"].clone("TitleJP")
-    title_style.fontName = font_name
-    title_style.leading = 18
-    normal_style = styles["Normal"].clone("NormalJP")
-    normal_style.fontName = font_name
+    ctx = _pdf_context()
+    font_name = ctx.font_name
+    title_style = ctx.title
+    normal_style = ctx.normal
 
     elements = []
     elements.append(Paragraph("看護師シフト 自動割当 結果", title_style))
@@ -82,31 +112,26 @@ def assignments_to_pdf(
 
     nurse_rows: List[Dict[str, Any]]
     if nurses:
-        nurse_rows = sorted(
-            nurses,
-            key=lambda x: (str(x.get("team")), int(str(x.get("id"))))
-            if str(x.get("id")).isdigit() else str(x.get("id"))
-        )
+        nurse_rows = sorted(nurses, key=_nurse_sort_key)
     else:
         uniq_ids = sorted({str(a.get("nurse_id")) for a in assignments}, key=lambda x: int(x))
         nurse_rows = [{"id": nid, "name": nid, "team": ""} for nid in uniq_ids]
 
-    assign_lookup: Dict[tuple[str, str], str] = {}
+    assign_lookup: Dict[str, Dict[str, str]] = {}
     for a in assignments:
         nid = str(a.get("nurse_id"))
         date = str(a.get("date"))
-        assign_lookup[(nid, date)] = str(a.get("shift"))
+        assign_lookup.setdefault(nid, {})[date] = str(a.get("shift"))
 
     header = ["Ns/Date"] + [d[-2:] for d in day_list]
     matrix: List[List[str]] = [header]
+    symbol = shift_symbols.get
     for nurse in nurse_rows:
         nid = str(nurse.get("id"))
         label = f"{nurse.get('name', nid)} ({nid})"
-        row = [label]
-        for day in day_list:
-            raw = assign_lookup.get((nid, day), "")
-            row.append(shift_symbols.get(raw, raw or ""))
-        matrix.append(row)
+        row_lookup = assign_lookup.get(nid, {})
+        raws = [row_lookup.get(day, "") for day in day_list]
+        matrix.append([label] + [symbol(raw, raw) for raw in raws])
 
     roster_table = Table(matrix, repeatRows=1)
     roster_table.setStyle(TableStyle([
@@ -124,9 +149,7 @@ def assignments_to_pdf(
     elements.append(Spacer(1, 12))
 
     if summary and summary.get("per_nurse"):
-        h2 = styles["Heading2"].clone("H2JP")
-        h2.fontName = font_name
-        elements.append(Paragraph("個人別サマリ", h2))
+        elements.append(Paragraph("個人別サマリ", ctx.heading))
         summary_header = ["Ns", "日勤", "遅番", "夜勤", "公休", "土日祝数", "勤務日数"]
         summary_rows = [summary_header]
         for info in summary["per_nurse"]:
@@ -151,9 +174,7 @@ def assignments_to_pdf(
         elements.append(Spacer(1, 12))
 
     if warnings:
-        h2 = styles["Heading2"].clone("H2JP2")
-        h2.fontName = font_name
-        elements.append(Paragraph("警告", h2))
+        elements.append(Paragraph("警告", ctx.heading))
         for warn in warnings[:20]:
             elements.append(Paragraph(f"・{warn}", normal_style))
 
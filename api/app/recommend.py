@@ -1,9 +1,12 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple, DefaultDict
+from typing import Any, Dict, List, DefaultDict
 from collections import defaultdict, Counter
 import datetime as dt
-from app.optimizer import days_in_month, is_weekend
+
+import numpy as np
+
+from app.optimizer import SHIFT_CAPABILITY, days_in_month, is_weekend
 
 Shift = str
 
@@ -15,57 +18,66 @@ def recommend_greedy(
 ) -> Dict[str, Any]:
     year = int(rules["year"])
     month = int(rules["month"])
-    all_days = [d.isoformat() for d in days_in_month(year, month)]
+    month_days = days_in_month(year, month)
+    all_days = [d.isoformat() for d in month_days]
 
     nurse_by_id = {str(n["id"]): n for n in nurses}
+    roster = list(nurse_by_id)
+    roster_pos = {nid: idx for idx, nid in enumerate(roster)}
+    day_pos = {date: idx for idx, date in enumerate(all_days)}
+    eligible = {
+        shift: np.array([nurse_by_id[nid].get(flag) is not False for nid in roster], dtype=bool)
+        for shift, flag in SHIFT_CAPABILITY.items()
+    }
 
     per_day_counts: DefaultDict[str, Counter] = defaultdict(Counter)
-    has_assignment: DefaultDict[Tuple[str, str], bool] = defaultdict(bool)
-    for a in assignments:
-        nid = str(a["nurse_id"])
-        date = a["date"]
-        shift = a["shift"]
-        per_day_counts[date][shift] += 1
-        has_assignment[(nid, date)] = True
+    for (date, shift), count in Counter((a["date"], a["shift"]) for a in assignments).items():
+        per_day_counts[date][shift] = count
+    has_assignment = np.zeros((len(roster), len(all_days)), dtype=bool)
+    cells = np.array(
+        [(roster_pos.get(str(a["nurse_id"]), -1), day_pos.get(a["date"], -1)) for a in assignments], dtype=np.intp
+    ).reshape(-1, 2)
+    cells = cells[(cells >= 0).all(axis=1)]
+    has_assignment[cells[:, 0], cells[:, 1]] = True
 
-    def demand_of(date_iso: str) -> Dict[str, int]:
-        d = dt.date.fromisoformat(date_iso)
-        dflt = rules.get("demand_defaults", {})
-        if d.weekday() == 6:
-            picked = dflt.get("sunday", {})
-        elif is_weekend(d):
-            picked = dflt.get("saturday_holiday", {})
-        else:
-            picked = dflt.get("weekday", {})
-        return {
+    violations: List[str] = []
+    suggestions: List[Dict[str, Any]] = []
+
+    def fill(date: str, shift: Shift, needed: int) -> None:
+        # First `needed` eligible nurses in roster order that are still free that day
+        col = day_pos[date]
+        picks = np.flatnonzero(eligible[shift] & ~has_assignment[:, col])[:needed]
+        has_assignment[picks, col] = True
+        per_day_counts[date][shift] += len(picks)
+        suggestions.extend({"nurse_id": roster[row], "date": date, "shift": shift} for row in picks.tolist())
+
+    dflt = rules.get("demand_defaults", {})
+    presets: Dict[str, Dict[str, int]] = {}
+    for key in ("weekday", "saturday_holiday", "sunday"):
+        picked = dflt.get(key, {})
+        presets[key] = {
             "day_min": int(picked.get("day_min", 0)),
             "day_max": int(picked.get("day_max", 9999)),
             "late": int(picked.get("late", 0)),
             "night": int(picked.get("night", 0)),
         }
 
-    violations: List[str] = []
-    suggestions: List[Dict[str, Any]] = []
+    def demand_of(d: dt.date) -> Dict[str, int]:
+        if d.weekday() == 6:
+            return presets["sunday"]
+        if is_weekend(d):
+            return presets["saturday_holiday"]
+        return presets["weekday"]
 
     # Fill shortages first (LATE/NIGHT exact, DAY min)
-    for date in all_days:
-        dem = demand_of(date)
+    for date, day in zip(all_days, month_days):
+        dem = demand_of(day)
         # LATE
         diff_late = dem["late"] - per_day_counts[date]["LATE"]
         if diff_late != 0:
             if diff_late > 0:
                 violations.append(f"{date} 遅番不足 {per_day_counts[date]['LATE']}/{dem['late']}")
-                for nid, n in nurse_by_id.items():
-                    if diff_late <= 0:
-                        break
-                    if has_assignment[(nid, date)]:
-                        continue
-                    if n.get("late_ok") is False:
-                        continue
-                    suggestions.append({"nurse_id": nid, "date": date, "shift": "LATE"})
-                    per_day_counts[date]["LATE"] += 1
-                    has_assignment[(nid, date)] = True
-                    diff_late -= 1
+                fill(date, "LATE", diff_late)
             else:
                 violations.append(f"{date} 遅番過多 {per_day_counts[date]['LATE']}/{dem['late']}")
         # NIGHT
@@ -73,34 +85,14 @@ def recommend_greedy(
         if diff_night != 0:
             if diff_night > 0:
                 violations.append(f"{date} 夜勤不足 {per_day_counts[date]['NIGHT']}/{dem['night']}")
-                for nid, n in nurse_by_id.items():
-                    if diff_night <= 0:
-                        break
-                    if has_assignment[(nid, date)]:
-                        continue
-                    if n.get("night_ok") is False:
-                        continue
-                    suggestions.append({"nurse_id": nid, "date": date, "shift": "NIGHT"})
-                    per_day_counts[date]["NIGHT"] += 1
-                    has_assignment[(nid, date)] = True
-                    diff_night -= 1
+                fill(date, "NIGHT", diff_night)
             else:
                 violations.append(f"{date} 夜勤過多 {per_day_counts[date]['NIGHT']}/{dem['night']}")
         # DAY min
         diff_day_min = dem["day_min"] - per_day_counts[date]["DAY"]
         if diff_day_min > 0:
             violations.append(f"{date} 日勤不足 {per_day_counts[date]['DAY']}/{dem['day_min']}")
-            for nid, n in nurse_by_id.items():
-                if diff_day_min <= 0:
-                    break
-                if has_assignment[(nid, date)]:
-                    continue
-                if n.get("day_ok") is False:
-                    continue
-                suggestions.append({"nurse_id": nid, "date": date, "shift": "DAY"})
-                per_day_counts[date]["DAY"] += 1
-                has_assignment[(nid, date)] = True
-                diff_day_min -= 1
+            fill(date, "DAY", diff_day_min)
         # DAY max
         if per_day_counts[date]["DAY"] > dem["day_max"]:
             violations.append(f"{date} 日勤過多 {per_day_counts[date]['DAY']}/{dem['day_max']}")
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import re
-from typing import Any, Dict, List, Tuple, Set
+from typing import Any, Callable, Dict, List, Tuple, Set
 
 TEAM_HEADERS = {
     "Aチーム": "A",
@@ -14,11 +14,151 @@ NIGHT_FORBIDDEN_PAIRS = [("7", "26")]
 CANNOT_LEAD_NIGHT = set(map(str, [9,11,19,20,27,29,30]))
 
 
+# Field order of a parsed nurse; id, name and team are filled in per nurse
+_DEFAULT_NURSE: Dict[str, Any] = {
+    "id": None,
+    "name": None,
+    "team": None,
+    "leader_ok": False,
+    "day_ok": True,
+    "late_ok": True,
+    "night_ok": True,
+    "week_max_days": None,
+    "weekend_cap": None,
+    "notes": None,
+}
+
+
 def _ids_from_token(token: str) -> List[str]:
     return [s for s in token.split(".") if s.strip()]
 
 
-def parse_shift_md(md_text: str, year: int, month: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+Nurse = Dict[str, Any]
+RuleHandler = Callable[[Nurse, Dict[str, Any], str], None]
+
+_LINE_RE = re.compile(r"^([0-9.]+)[:：](.+)$")
+_NIGHT_RANGE_RE = re.compile(r"(\d+)[-～–](\d+)回/月")
+_PER_MONTH_RE = re.compile(r"(\d+)回/月")
+
+
+def _day_only(nurse: Nurse, pr: Dict[str, Any]) -> None:
+    nurse["night_ok"] = False
+    nurse["late_ok"] = False
+    pr["only_day"] = True
+
+
+def _rule_manager(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    nurse["leader_ok"] = True
+
+
+def _rule_only_day(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    _day_only(nurse, pr)
+
+
+def _rule_weekday_day(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    _day_only(nurse, pr)
+    pr["weekend_off"] = True
+
+
+def _rule_day_4_per_week(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    _day_only(nurse, pr)
+    pr["week_max_days"] = 4
+
+
+def _rule_night_dedicated(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    nurse["day_ok"] = False
+    nurse["late_ok"] = False
+    pr["only_night"] = True
+
+
+def _rule_night_per_month(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    rng = _NIGHT_RANGE_RE.search(desc)
+    if rng:
+        pr["night_min"] = int(rng.group(1))
+        pr["night_max"] = int(rng.group(2))
+    else:
+        eq = _PER_MONTH_RE.search(desc)
+        if eq:
+            pr["night_min"] = pr["night_max"] = int(eq.group(1))
+
+
+def _rule_newcomer(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    pr["night_min"] = pr["night_max"] = 2
+    pr["extra_staff"] = True
+
+
+def _rule_two_per_week(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    pr["week_max_days"] = 2
+
+
+def _rule_weekend_cap(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    pr["weekend_cap_per_month"] = 3
+
+
+def _rule_weekend_off(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    pr["weekend_off"] = True
+
+
+def _fixed_hours(hours: str) -> RuleHandler:
+    def apply(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+        pr["fixed_hours"] = hours
+    return apply
+
+
+def _rule_no_day(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    nurse["day_ok"] = False
+    pr["only_night"] = True
+
+
+def _rule_weekend_night(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    pr["only_night"] = True
+    pr["weekend_only_night"] = True
+    pr["night_min"] = pr.get("night_min", 2)
+    pr["night_max"] = pr.get("night_max", 2)
+
+
+def _rule_weekend_part_time(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    pr["only_day"] = True
+    pr["weekend_day_only"] = True
+    pr["month_quota_days"] = 2
+
+
+def _rule_day_part_time(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    pr["only_day"] = True
+    pr["month_quota_days"] = 2
+
+
+def _rule_extra_holiday(nurse: Nurse, pr: Dict[str, Any], desc: str) -> None:
+    pr["extra_holidays"] = 1
+
+
+# Description keywords and their effects, applied in this order. Plain substring
+# tests rather than one alternation regex, since keywords overlap (平日日勤のみ).
+DESC_RULES: List[Tuple[Callable[[str], bool], RuleHandler]] = [
+    (lambda d: "管理者" in d, _rule_manager),
+    (lambda d: "日勤のみ" in d, _rule_only_day),
+    (lambda d: "平日日勤" in d, _rule_weekday_day),
+    (lambda d: "日勤4回/週" in d, _rule_day_4_per_week),
+    (lambda d: "夜勤専従" in d, _rule_night_dedicated),
+    (lambda d: "夜勤" in d and "回/月" in d, _rule_night_per_month),
+    (lambda d: "新人" in d and "夜勤2回/月" in d, _rule_newcomer),
+    (lambda d: "2回/週" in d, _rule_two_per_week),
+    (lambda d: "土日祝日3回/月まで" in d or "土日祝3回/月" in d, _rule_weekend_cap),
+    (lambda d: "土日祝日NG" in d or "土日祝NG" in d, _rule_weekend_off),
+    (lambda d: "9:00-17:00" in d, _fixed_hours("09:00-17:00")),
+    (lambda d: "9:00-16:30" in d, _fixed_hours("09:00-16:30")),
+    (lambda d: "9:00-13:00" in d, _fixed_hours("09:00-13:00")),
+    (lambda d: "日勤なし" in d, _rule_no_day),
+    (lambda d: "土日夜勤2回/月" in d, _rule_weekend_night),
+    (lambda d: "バイト" in d and "土日勤" in d, _rule_weekend_part_time),
+    (lambda d: "日勤バイト" in d, _rule_day_part_time),
+    (lambda d: "公休10日" in d, _rule_extra_holiday),
+]
+
+
+def parse_shift_md(md_text: str | bytes, year: int, month: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    if isinstance(md_text, bytes):
+        md_text = md_text.decode("utf-8")
     team: str | None = None
     nurses: Dict[str, Dict[str, Any]] = {}
     person_rules: Dict[str, Dict[str, Any]] = {}
@@ -27,20 +167,8 @@ def parse_shift_md(md_text: str, year: int, month: int) -> Tuple[List[Dict[str,
 
     def ensure_nurse(nid: str, team_code: str):
         if nid not in nurses:
-            nurses[nid] = {
-                "id": nid,
-                "name": f"Nurse_{nid}",
-                "team": team_code,
-                "leader_ok": False,
-                "day_ok": True,
-                "late_ok": True,
-                "night_ok": True,
-                "week_max_days": None,
-                "weekend_cap": None,
-                "notes": None,
-            }
-        if nid not in person_rules:
-            person_rules[nid] = {}
+            nurses[nid] = {**_DEFAULT_NURSE, "id": nid, "name": f"Nurse_{nid}", "team": team_code}
+            person_rules.setdefault(nid, {})
 
     for raw in lines:
         if not raw:
@@ -52,76 +180,17 @@ def parse_shift_md(md_text: str, year: int, month: int) -> Tuple[List[Dict[str,
             team = None
             continue
         if team in {"A", "B", "ER"}:
-            m = re.match(r"^([0-9.]+)[:：](.+)$", raw)
+            m = _LINE_RE.match(raw)
             if not m:
                 continue
             ids = _ids_from_token(m.group(1))
             desc = m.group(2)
+            # Match the description once per line, then apply it to every id on it
+            handlers = [handler for matches, handler in DESC_RULES if matches(desc)]
             for nid in ids:
                 ensure_nurse(nid, team)
-                pr = person_rules[nid]
-                # rules per description
-                if "管理者" in desc:
-                    nurses[nid]["leader_ok"] = True
-                if "日勤のみ" in desc:
-                    nurses[nid]["night_ok"] = False
-                    nurses[nid]["late_ok"] = False
-                    pr["only_day"] = True
-                if "平日日勤" in desc:
-                    pr["only_day"] = True
-                    pr["weekend_off"] = True
-                    nurses[nid]["night_ok"] = False
-                    nurses[nid]["late_ok"] = False
-                if "日勤4回/週" in desc:
-                    pr["only_day"] = True
-                    pr["week_max_days"] = 4
-                    nurses[nid]["night_ok"] = False
-                    nurses[nid]["late_ok"] = False
-                if "夜勤専従" in desc:
-                    nurses[nid]["day_ok"] = False
-                    nurses[nid]["late_ok"] = False
-                    pr["only_night"] = True
-                if "夜勤" in desc and "回/月" in desc:
-                    rng = re.search(r"(\d+)[-～–](\d+)回/月", desc)
-                    if rng:
-                        pr["night_min"] = int(rng.group(1))
-                        pr["night_max"] = int(rng.group(2))
-                    else:
-                        eq = re.search(r"(\d+)回/月", desc)
-                        if eq:
-                            pr["night_min"] = pr["night_max"] = int(eq.group(1))
-                if "新人" in desc and "夜勤2回/月" in desc:
-                    pr["night_min"] = pr["night_max"] = 2
-                    pr["extra_staff"] = True
-                if "2回/週" in desc:
-                    pr["week_max_days"] = 2
-                if "土日祝日3回/月まで" in desc or "土日祝3回/月" in desc:
-                    pr["weekend_cap_per_month"] = 3
-                if "土日祝日NG" in desc or "土日祝NG" in desc:
-                    pr["weekend_off"] = True
-                if "9:00-17:00" in desc:
-                    pr["fixed_hours"] = "09:00-17:00"
-                if "9:00-16:30" in desc:
-                    pr["fixed_hours"] = "09:00-16:30"
-                if "9:00-13:00" in desc:
-                    pr["fixed_hours"] = "09:00-13:00"
-                if "日勤なし" in desc:
-                    nurses[nid]["day_ok"] = False
-                    pr["only_night"] = True
-                if "土日夜勤2回/月" in desc:
-                    pr["only_night"] = True
-                    pr["weekend_only_night"] = True
-                    pr["night_min"] = pr.get("night_min", 2)
-                    pr["night_max"] = pr.get("night_max", 2)
-                if "バイト" in desc and "土日勤" in desc:
-                    pr["only_day"] = True
-                    pr["weekend_day_only"] = True
-                    pr["month_quota_days"] = 2
-                if "日勤バイト" in desc:
-                    pr["only_day"] = True
-                    pr["month_quota_days"] = 2
-                if "公休10日" in desc:
-                    pr["extra_holidays"] = 1
+                for apply_rule in handlers:
+                    apply_rule(nurses[nid], person_rules[nid], desc)
         else:
             # その他: global constraints are handled below by constants
             continue
@@ -1,60 +1,109 @@
+import codecs
 import csv
-import json
+import os
 import pathlib
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Union
 
+import orjson
 from jsonschema import Draft202012Validator
 
+# A filesystem path, or a binary file object such as UploadFile.file
+Source = Union[str, os.PathLike, BinaryIO]
 
-def load_json(path: str | pathlib.Path) -> Any:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
 
+def load_json(source: Source) -> Any:
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return orjson.loads(f.read())
+    return orjson.loads(source.read())
 
-def load_schema(schema_path: str | pathlib.Path) -> Draft202012Validator:
-    schema = load_json(schema_path)
+
+@lru_cache(maxsize=16)
+def _compiled_validator(resolved_path: str, mtime_ns: int) -> Draft202012Validator:
+    schema = load_json(resolved_path)
     return Draft202012Validator(schema)
 
 
+@lru_cache(maxsize=16)
+def _compiled_item_validator(resolved_path: str, mtime_ns: int) -> Optional[Draft202012Validator]:
+    validator = _compiled_validator(resolved_path, mtime_ns)
+    items = validator.schema.get("items")
+    if validator.schema.get("type") != "array" or not isinstance(items, dict):
+        return None
+    # evolve() keeps the root resolver, so $refs inside items still resolve
+    return validator.evolve(schema=items)
+
+
+def load_schema(schema_path: str | pathlib.Path) -> Draft202012Validator:
+    # Validators are reused until the schema file changes on disk
+    path = pathlib.Path(schema_path).resolve()
+    return _compiled_validator(str(path), path.stat().st_mtime_ns)
+
+
+def load_item_schema(schema_path: str | pathlib.Path) -> Optional[Draft202012Validator]:
+    # Validator for the items of an array schema, or None if it is not one
+    path = pathlib.Path(schema_path).resolve()
+    return _compiled_item_validator(str(path), path.stat().st_mtime_ns)
+
+
+_TRUE_VALUES = frozenset(("true", "1", "yes", "y"))
+_FALSE_VALUES = frozenset(("false", "0", "no", "n"))
+
+
 def parse_bool(value: str) -> bool | None:
     if value is None:
         return None
     v = str(value).strip().lower()
-    if v in {"true", "1", "yes", "y"}:
+    if v in _TRUE_VALUES:
         return True
-    if v in {"false", "0", "no", "n"}:
+    if v in _FALSE_VALUES:
         return False
     return None
 
 
-def parse_nurses_csv(csv_path: str | pathlib.Path) -> List[Dict[str, Any]]:
+def _int_or_none(value: Optional[str]) -> Optional[int]:
+    return int(value) if value and value.isdigit() else None
+
+
+def _parse_nurse_rows(lines: Iterable[str]) -> List[Dict[str, Any]]:
     rows: List[Dict[str, Any]] = []
-    with open(csv_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            parsed: Dict[str, Any] = {
-                "id": str(row.get("id", "")).strip(),
-                "name": (row.get("name") or "").strip(),
-                "team": (row.get("team") or "").strip(),
-                "leader_ok": parse_bool(row.get("leader_ok")),
-                "day_ok": parse_bool(row.get("day_ok")),
-                "late_ok": parse_bool(row.get("late_ok")),
-                "night_ok": parse_bool(row.get("night_ok")),
-                "week_max_days": int(row["week_max_days"]) if (row.get("week_max_days") or "").isdigit() else None,
-                "weekend_cap": int(row["weekend_cap"]) if (row.get("weekend_cap") or "").isdigit() else None,
-                "notes": row.get("notes"),
-            }
-            rows.append(parsed)
+    reader = csv.DictReader(lines)
+    for row in reader:
+        parsed: Dict[str, Any] = {
+            "id": str(row.get("id", "")).strip(),
+            "name": (row.get("name") or "").strip(),
+            "team": (row.get("team") or "").strip(),
+            "leader_ok": parse_bool(row.get("leader_ok")),
+            "day_ok": parse_bool(row.get("day_ok")),
+            "late_ok": parse_bool(row.get("late_ok")),
+            "night_ok": parse_bool(row.get("night_ok")),
+            "week_max_days": _int_or_none(row.get("week_max_days")),
+            "weekend_cap": _int_or_none(row.get("weekend_cap")),
+            "notes": row.get("notes"),
+        }
+        rows.append(parsed)
     return rows
 
 
+def parse_nurses_csv(csv_source: Source) -> List[Dict[str, Any]]:
+    if isinstance(csv_source, (str, os.PathLike)):
+        with open(csv_source, "r", encoding="utf-8") as f:
+            return _parse_nurse_rows(f)
+    return _parse_nurse_rows(codecs.iterdecode(csv_source, "utf-8"))
+
+
 def validate_nurses(nurses: List[Dict[str, Any]], schema_path: str | pathlib.Path) -> List[str]:
-    validator = load_schema(schema_path)
     errors: List[str] = []
-    # Validate as an array schema by wrapping in a fake root if needed
-    # Here we validate item-by-item to produce clearer messages
+    # Validate item-by-item to produce clearer messages
+    item_validator = load_item_schema(schema_path)
+    validator = load_schema(schema_path) if item_validator is None else None
     for idx, nurse in enumerate(nurses):
-        for err in validator.iter_errors([nurse]):  # schema expects array
+        if item_validator is not None:
+            found = item_validator.iter_errors(nurse)
+        else:
+            found = validator.iter_errors([nurse])  # schema expects array
+        for err in found:
             errors.append(f"nurses[{idx}]: {err.message}")
     return errors
 
@@ -68,8 +117,8 @@ def validate_rules(rules: Dict[str, Any], schema_path: str | pathlib.Path) -> Li
 
 
 def load_and_validate(
-    nurses_csv: str | pathlib.Path,
-    rules_json: str | pathlib.Path,
+    nurses_csv: Source,
+    rules_json: Source,
     schemas_dir: str | pathlib.Path,
 ) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
     schemas_dir = pathlib.Path(schemas_dir)
@@ -0,0 +1,120 @@
+import json
+import pathlib
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+ROOT = pathlib.Path(__file__).parents[2]
+client = TestClient(app)
+
+
+def _upload_files(**extra):
+    files = {
+        "nurses": ("nurses.csv", (ROOT / "samples/nurses.csv").read_bytes(), "text/csv"),
+        "rules": ("rules.json", (ROOT / "samples/rules.json").read_bytes(), "application/json"),
+    }
+    files.update(extra)
+    return files
+
+
+def test_non_object_assignments_are_bad_requests():
+    for body in ({"assignments": [1, 2]}, {"assignments": {"nurse_id": "1"}}):
+        upload = ("assignments.json", json.dumps(body).encode(), "application/json")
+        res = client.post("/recheck", files=_upload_files(assignments=upload))
+        assert res.status_code == 400
+    assert client.post("/export/pdf", json={"assignments": [1]}).status_code == 400
+    assert client.post("/export/csv", json={"assignments": ["x"]}).status_code == 400
+    res = client.post("/optimize/with-fixed", files=_upload_files(), data={"fixed_assignments": "[1]"})
+    assert res.status_code == 400
+    nested = {"assignments": [{"nurse_id": ["1"], "date": "2025-10-01", "shift": "DAY"}]}
+    upload = ("assignments.json", json.dumps(nested).encode(), "application/json")
+    assert client.post("/recheck", files=_upload_files(assignments=upload)).status_code == 400
+    assert client.post("/recommend", json=nested).status_code == 400
+    assert client.post("/export/pdf", json={"assignments": [], "days": 5}).status_code == 400
+    mixed_ids = {"assignments": [], "nurses": [{"id": "2", "team": "A"}, {"id": "x1", "team": "B"}]}
+    assert client.post("/export/pdf", json=mixed_ids).status_code == 200
+
+
+def test_unserializable_result_is_a_server_error(monkeypatch):
+    import app.main as main
+
+    # A stray non-JSON value in solver output must not be reported as a client error
+    monkeypatch.setattr(main, "build_schedule", lambda *args, **kwargs: {"status": "OK", "value": object()})
+    res = TestClient(app, raise_server_exceptions=False).post("/optimize", files=_upload_files())
+    assert res.status_code == 500
+
+
+def _cors_client(middleware=None, **options):
+    from starlette.applications import Starlette
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+
+    from app.main import WildcardCORSMiddleware
+
+    def ping(request):
+        return PlainTextResponse("ok")
+
+    def preset(request):
+        return PlainTextResponse("ok", headers={"Access-Control-Allow-Origin": "https://stale.example"})
+
+    inner = Starlette(routes=[Route("/ping", ping, methods=["GET", "POST"]), Route("/preset", preset)])
+    return TestClient((middleware or WildcardCORSMiddleware)(inner, **options))
+
+
+_PREFLIGHT = {
+    "Origin": "https://app.example",
+    "Access-Control-Request-Method": "POST",
+    "Access-Control-Request-Headers": "content-type, x-custom",
+}
+
+
+def test_wildcard_cors_preflight():
+    res = _cors_client().options("/ping", headers=_PREFLIGHT)
+    assert res.status_code == 200
+    assert res.headers["access-control-allow-origin"] == "*"
+    assert res.headers["access-control-allow-methods"] == "DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+    assert res.headers["access-control-max-age"] == "600"
+    assert res.headers["access-control-allow-headers"] == "content-type, x-custom"
+
+
+def test_wildcard_cors_simple_requests():
+    cors = _cors_client()
+    res = cors.get("/ping", headers={"Origin": "https://app.example"})
+    assert res.status_code == 200
+    assert res.headers["access-control-allow-origin"] == "*"
+    res = cors.get("/ping")
+    assert not [name for name in res.headers if name.startswith("access-control-")]
+    # An endpoint's own value is overwritten, as CORSMiddleware does
+    res = cors.get("/preset", headers={"Origin": "https://app.example"})
+    assert res.headers["access-control-allow-origin"] == "*"
+
+
+def test_wildcard_cors_matches_starlette():
+    from starlette.middleware.cors import CORSMiddleware
+
+    ours = _cors_client()
+    theirs = _cors_client(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+    requests = [
+        ("OPTIONS", "/ping", _PREFLIGHT),
+        ("GET", "/ping", {"Origin": "https://app.example"}),
+        ("POST", "/ping", {}),
+        ("GET", "/preset", {"Origin": "https://app.example"}),
+    ]
+    for method, path, headers in requests:
+        a = ours.request(method, path, headers=headers)
+        b = theirs.request(method, path, headers=headers)
+        assert a.status_code == b.status_code
+        cors_a = {k: v for k, v in a.headers.items() if k.startswith("access-control-")}
+        cors_b = {k: v for k, v in b.headers.items() if k.startswith("access-control-")}
+        assert cors_a == cors_b, (method, path)
+
+
+def test_export_endpoints_document_json_bodies():
+    paths = client.get("/openapi.json").json()["paths"]
+    for path in ("/export/csv", "/export/pdf"):
+        body = paths[path]["post"]["requestBody"]
+        assert body["required"] is True
+        assert body["content"]["application/json"]["schema"]["required"] == ["assignments"]
+    pdf_schema = paths["/export/pdf"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    assert {"nurses", "days", "summary", "warnings"} <= set(pdf_schema["properties"])
@@ -1,6 +1,8 @@
+import io
+import os
 import pathlib
 import json
-from app.validation import load_and_validate
+from app.validation import load_and_validate, load_schema
 from app.optimizer import to_csv, recheck_assignments, build_schedule
 
 ROOT = pathlib.Path(__file__).parents[2]
@@ -15,6 +17,28 @@ def test_load_and_validate_samples():
     assert isinstance(rules, dict) and rules.get("year")
 
 
+def test_load_and_validate_file_objects_match_paths():
+    nurses_csv = ROOT / "samples/nurses.csv"
+    rules_json = ROOT / "samples/rules.json"
+    schemas = ROOT / "packages/schemas"
+    expected = load_and_validate(nurses_csv, rules_json, schemas)
+    loaded = load_and_validate(io.BytesIO(nurses_csv.read_bytes()), io.BytesIO(rules_json.read_bytes()), schemas)
+    assert loaded == expected
+
+
+def test_load_schema_reuses_validator_until_file_changes(tmp_path):
+    schema_path = tmp_path / "rules.schema.json"
+    schema_path.write_text(json.dumps({"type": "object"}), encoding="utf-8")
+    first = load_schema(schema_path)
+    assert load_schema(str(schema_path)) is first
+    schema_path.write_text(json.dumps({"type": "array"}), encoding="utf-8")
+    mtime = schema_path.stat().st_mtime_ns + 1_000_000
+    os.utime(schema_path, ns=(mtime, mtime))
+    reloaded = load_schema(schema_path)
+    assert reloaded is not first
+    assert reloaded.schema == {"type": "array"}
+
+
 def test_to_csv_roundtrip():
     assignments = [
         {"nurse_id": "1", "date": "2025-10-01", "shift": "OFF"},
@@ -38,6 +62,21 @@ def test_recheck_basic():
     assert res["violations"]
 
 
+def test_recheck_reports_unknown_nurse():
+    nurses_csv = ROOT / "samples/nurses.csv"
+    rules_json = ROOT / "samples/rules.json"
+    schemas = ROOT / "packages/schemas"
+    nurses, rules = load_and_validate(nurses_csv, rules_json, schemas)
+    date = f"{rules['year']}-{rules['month']:02d}-01"
+    assignments = [
+        {"nurse_id": "1", "date": date, "shift": "OFF"},
+        {"nurse_id": "999", "date": date, "shift": "DAY"},
+    ]
+    res = recheck_assignments(assignments, nurses, rules)
+    assert "unknown nurse_id 999" in res["violations"]
+    assert res["recommendations"]
+
+
 def test_build_schedule_alternatives():
     nurses_csv = ROOT / "samples/nurses.csv"
     rules_json = ROOT / "samples/rules.json"